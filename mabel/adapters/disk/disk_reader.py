@@ -1,3 +1,8 @@
+import io
+import mmap
+import os
+from typing import Optional
+
 from ...data.readers.internals.base_inner_reader import BUFFER_SIZE
 from ...data.readers.internals.base_inner_reader import BaseInnerReader
 
@@ -6,6 +11,9 @@ class DiskReader(BaseInnerReader):
     def __init__(self, **kwargs):
         """
         File System Reader
+
+        Blobs are memory mapped rather than read, so they aren't copied into memory
+        and can be read from before the whole file has been read from disk.
         """
         super().__init__(**kwargs)
 
@@ -18,3 +26,23 @@ class DiskReader(BaseInnerReader):
     def get_blob_bytes(self, blob_name: str) -> bytes:
         with open(blob_name, "rb") as f:
             return f.read()
+
+    def get_blob_range(self, blob_name: str, start: int, length: Optional[int] = None) -> bytes:
+        with open(blob_name, "rb") as f:
+            if start < 0:
+                start = max(os.fstat(f.fileno()).st_size + start, 0)
+            f.seek(start)
+            return f.read(-1 if length is None else length)
+
+    def read_blob(self, blob: str):
+        if self.blob_cache is not None and blob in self.immutable_blobs:
+            return super().read_blob(blob)
+        with open(blob, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # empty files can't be memory mapped
+                return io.BytesIO(b"")
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    async def async_read_blob(self, blob: str):
+        # mapping the file doesn't read it, so there's nothing to wait for
+        return self.read_blob(blob)
@@ -1,9 +1,19 @@
 """
 Google Cloud Storage Reader
+
+Creating a client authenticates and opens a new HTTP session, so clients are
+created once per process and shared by all of the readers in it. Blobs are
+accessed directly by name, which doesn't make any requests until the blob is
+downloaded.
+
+The client's connections are pooled, the pool is made big enough for the
+requests the async methods make at once.
 """
 
 import os
+import threading
 
+from mabel.data.readers.internals.base_inner_reader import MAX_CONCURRENCY
 from mabel.data.readers.internals.base_inner_reader import BaseInnerReader
 from mabel.errors import MissingDependencyError
 from mabel.utils import paths
@@ -11,12 +21,42 @@ from mabel.utils import paths
 try:
     from google.auth.credentials import AnonymousCredentials  # type:ignore
     from google.cloud import storage  # type:ignore
+    from requests.adapters import HTTPAdapter
 
     google_cloud_storage_installed = True
 except ImportError:  # pragma: no cover
     google_cloud_storage_installed = False
 
 
+# clients, keyed by the process and the credentials they were created with
+_clients: dict = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(credentials=None):
+    """
+    Get a storage client for the credentials, clients aren't shared between
+    processes as their HTTP sessions can't be used after a fork.
+    """
+    # this means we're testing
+    testing = os.environ.get("STORAGE_EMULATOR_HOST") is not None
+    key = (os.getpid(), testing, id(credentials))
+    with _clients_lock:
+        if key not in _clients:
+            if testing:
+                client = storage.Client(credentials=AnonymousCredentials())
+            else:  # pragma: no cover
+                client = storage.Client(credentials=credentials)
+            adapter = HTTPAdapter(pool_connections=MAX_CONCURRENCY, pool_maxsize=MAX_CONCURRENCY)
+            for prefix in ("https://", "http://"):
+                # don't replace adapters the client has configured, like for mTLS
+                if type(client._http.get_adapter(prefix)) is HTTPAdapter:
+                    client._http.mount(prefix, adapter)
+            # keep the credentials so their id isn't reused while we have the client
+            _clients[key] = (credentials, client)
+        return _clients[key][1]
+
+
 class GoogleCloudStorageReader(BaseInnerReader):
     def __init__(self, credentials=None, **kwargs):
         if not google_cloud_storage_installed:  # pragma: no cover
@@ -26,38 +66,44 @@ class GoogleCloudStorageReader(BaseInnerReader):
 
         super().__init__(**kwargs)
         self.credentials = credentials
+        self._buckets: dict = {}
+
+    def _get_bucket(self, bucket):
+        # getting a bucket by name doesn't make a request, unlike `get_bucket`
+        key = (os.getpid(), bucket)
+        gcs_bucket = self._buckets.get(key)
+        if gcs_bucket is None:
+            gcs_bucket = get_client(self.credentials).bucket(bucket)
+            self._buckets[key] = gcs_bucket
+        return gcs_bucket
 
     def get_blob_bytes(self, blob_name):
         bucket, object_path, name, extension = paths.get_parts(blob_name)
-        blob = get_blob(
-            bucket=bucket,
-            blob_name=object_path + name + extension,
-        )
+        blob = self._get_bucket(bucket).blob(object_path + name + extension)
         stream = blob.download_as_bytes()
         return stream
 
+    def get_blob_range(self, blob_name, start, length=None):
+        if length == 0:
+            return b""
+        bucket, object_path, name, extension = paths.get_parts(blob_name)
+        blob = self._get_bucket(bucket).blob(object_path + name + extension)
+        if start < 0:
+            # requests the last bytes of the blob, without knowing its size
+            data = blob.download_as_bytes(start=start)
+            return data if length is None else data[:length]
+        end = None if length is None else start + length - 1
+        return blob.download_as_bytes(start=start, end=end)
+
     def get_blobs_at_path(self, path):
         bucket, object_path, name, extension = paths.get_parts(path)
 
-        # this means we're testing
-        if os.environ.get("STORAGE_EMULATOR_HOST") is not None:
-            client = storage.Client(credentials=AnonymousCredentials())
-        else:  # pragma: no cover
-            client = storage.Client()
-
-        gcs_bucket = client.get_bucket(bucket)
-        blobs = list(client.list_blobs(bucket_or_name=gcs_bucket, prefix=object_path))
+        blobs = get_client(self.credentials).list_blobs(
+            bucket_or_name=self._get_bucket(bucket), prefix=object_path
+        )
 
         yield from [bucket + "/" + blob.name for blob in blobs if not blob.name.endswith("/")]
 
 
 def get_blob(bucket: str = None, blob_name: str = None):
-    # this means we're testing
-    if os.environ.get("STORAGE_EMULATOR_HOST") is not None:
-        client = storage.Client(credentials=AnonymousCredentials())
-    else:  # pragma: no cover
-        client = storage.Client()
-
-    gcs_bucket = client.get_bucket(bucket)
-    blob = gcs_bucket.get_blob(blob_name)
-    return blob
+    return get_client().bucket(bucket).blob(blob_name)
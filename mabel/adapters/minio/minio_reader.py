@@ -2,12 +2,16 @@
 MinIo Reader - also works with AWS
 """
 
+import os
+
 from ...data.readers.internals.base_inner_reader import BaseInnerReader
 from ...errors import MissingDependencyError
 from ...utils import dates
 from ...utils import paths
 
 try:
+    import certifi
+    import urllib3
     from minio import Minio  # type:ignore
 
     minio_installed = True
@@ -31,7 +35,28 @@ class MinIoReader(BaseInnerReader):
 
         super().__init__(**kwargs)
         secure = kwargs.get("secure", True)
-        self.minio = Minio(end_point, access_key, secret_key, secure=secure)
+        self.end_point = end_point
+        self.minio = Minio(
+            end_point, access_key, secret_key, secure=secure, http_client=self._http_client()
+        )
+
+    def _http_client(self):
+        # the same as the client's default, except the connection pool is big enough
+        # for the requests the async methods make at once
+        timeout = 5 * 60
+        return urllib3.PoolManager(
+            timeout=urllib3.Timeout(connect=timeout, read=timeout),
+            maxsize=self.max_concurrency,
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+            retries=urllib3.Retry(
+                total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]
+            ),
+        )
+
+    def _listing_cache_key(self):
+        # the listing also depends on the dates, they're applied to the path here
+        return (super()._listing_cache_key(), self.end_point, self.start_date, self.end_date)
 
     def get_blobs_at_path(self, path):
         bucket, object_path, _, _ = paths.get_parts(path)
@@ -52,3 +77,22 @@ class MinIoReader(BaseInnerReader):
             return stream.read()
         finally:
             stream.close()
+
+    def get_blob_range(self, blob_name: str, start: int, length=None) -> bytes:
+        if length == 0:
+            return b""
+        bucket, object_path, name, extension = paths.get_parts(blob_name)
+        object_name = object_path + name + extension
+        if start < 0:
+            size = self.minio.stat_object(bucket, object_name).size
+            if size is None:
+                # we don't know where the end is, read the object and take the end
+                data = self.get_blob_bytes(blob_name)[start:]
+                return data if length is None else data[:length]
+            start = max(size + start, 0)
+        # a length of 0 is the rest of the object
+        stream = self.minio.get_object(bucket, object_name, offset=start, length=length or 0)
+        try:
+            return stream.read()
+        finally:
+            stream.close()
@@ -0,0 +1,223 @@
+"""
+Evaluate ANDed or ORed terms of a filter in the order which does the least work.
+
+The order filters are written in isn't always a good order to evaluate them in, a
+slow predicate which rarely removes records is best run after a fast predicate
+which removes most of them. While records are filtered, some are sampled, all of
+the terms are evaluated for the sampled records, timing them and counting how
+often they pass, and the terms are reordered from what's been seen.
+
+ANDed terms are ordered by their cost divided by how often they fail, ORed terms
+by their cost divided by how often they pass, so the terms which are most likely
+to decide the result for the least work are run first.
+
+The terms mustn't change the records. A term which raises an error only raises it
+if it would have been evaluated in the current order, so sampling doesn't add
+errors.
+
+Sampling and reordering is only worth it if the best order can't be worked out up
+front, see `worth_adapting`, otherwise the terms are put in order once and
+evaluated with `evaluate_in_order`.
+"""
+
+import time
+from typing import Callable
+from typing import List
+from typing import Optional
+
+# one in this many records is sampled, this must be a power of 2
+SAMPLE_EVERY: int = 64
+# the terms are reordered after this many samples
+REORDER_EVERY: int = 16
+# a rough guess at how often comparisons with these operators pass, equality rarely
+# passes and inequality usually does, for other operators it depends on the data
+PASS_RATES = {"=": 0.1, "==": 0.1, "is": 0.1, "!=": 0.9, "<>": 0.9}
+
+
+def worth_adapting(costs: List[int], pass_rates: List[Optional[float]]) -> bool:
+    """
+    Terms are only worth reordering as they're evaluated if they cost different
+    amounts to run, or we can't guess how often they pass.
+    """
+    return len(set(costs)) > 1 or any(rate is None for rate in pass_rates)
+
+
+def combined_pass_rate(pass_rates: List[Optional[float]], is_and: bool) -> Optional[float]:
+    """
+    A guess at how often ANDed or ORed terms pass, None if we can't guess for any
+    of the terms.
+    """
+    rates = [rate for rate in pass_rates if rate is not None]
+    if len(rates) < len(pass_rates):
+        return None
+    combined = 1.0
+    for rate in rates:
+        combined *= rate if is_and else 1 - rate
+    return combined if is_and else 1 - combined
+
+
+def static_order(pass_rates: List[Optional[float]], is_and: bool) -> List[int]:
+    """
+    The order to evaluate terms which aren't worth reordering in, the terms most
+    likely to decide the result first.
+    """
+    return sorted(
+        range(len(pass_rates)),
+        key=lambda index: (pass_rates[index] or 0.0) * (1 if is_and else -1),
+    )
+
+
+def evaluate_in_order(terms: List[Callable], is_and: bool) -> Callable:
+    """
+    Evaluate ANDed or ORed terms in the order they're given, like `and` and `or`,
+    the value of the term which decided is returned.
+    """
+    ordered = tuple(terms)
+
+    if is_and:
+
+        def all_terms(record):
+            for term in ordered:
+                value = term(record)
+                if not value:
+                    return value
+            return value
+
+        return all_terms
+
+    def any_terms(record):
+        for term in ordered:
+            value = term(record)
+            if value:
+                return value
+        return value
+
+    return any_terms
+
+
+class AdaptiveTerms:
+    __slots__ = (
+        "terms",
+        "labels",
+        "is_and",
+        "ordered",
+        "order",
+        "records",
+        "samples",
+        "passed",
+        "elapsed",
+        "fallback",
+    )
+
+    def __init__(
+        self,
+        terms: List[Callable],
+        labels: List[str],
+        is_and: bool = True,
+        fallback: Optional[Callable] = None,
+    ):
+        """
+        Parameters:
+            terms: list of callables
+                The terms, each is called with the record
+            labels: list of strings
+                A description of each term, for the statistics
+            is_and: boolean
+                True if the terms are ANDed, False if they're ORed
+            fallback: callable (optional)
+                Called with the record if a term raises an error, to evaluate
+                the terms in the order they were written
+        """
+        self.terms = list(terms)
+        self.labels = list(labels)
+        self.is_and = is_and
+        self.fallback = fallback
+        self.order = list(range(len(self.terms)))
+        self.ordered = tuple(self.terms)
+        self.records = 0
+        self.samples = [0] * len(self.terms)
+        self.passed = [0] * len(self.terms)
+        self.elapsed = [0] * len(self.terms)
+
+    def __call__(self, record):
+        self.records += 1
+        if self.records & (SAMPLE_EVERY - 1):
+            # like `and` and `or`, the value of the term which decided is returned
+            try:
+                if self.is_and:
+                    for term in self.ordered:
+                        value = term(record)
+                        if not value:
+                            return value
+                    return value
+                for term in self.ordered:
+                    value = term(record)
+                    if value:
+                        return value
+                return value
+            except Exception:
+                if self.fallback is None:
+                    raise
+                return self.fallback(record)
+        return self._sample(record)
+
+    def _sample(self, record):
+        outcomes = []
+        for index in self.order:
+            start = time.perf_counter_ns()
+            try:
+                outcomes.append((self.terms[index](record), None))
+            except Exception as err:
+                outcomes.append((None, err))
+            self.elapsed[index] += time.perf_counter_ns() - start
+            self.samples[index] += 1
+            self.passed[index] += outcomes[-1][1] is None and bool(outcomes[-1][0])
+
+        if self.samples[self.order[0]] % REORDER_EVERY == 0:
+            self._reorder()
+
+        # the result, and any error, are what evaluating in order would give
+        for value, error in outcomes:
+            if error is not None:
+                if self.fallback is None:
+                    raise error
+                return self.fallback(record)
+            if bool(value) != self.is_and:
+                return value
+        return value
+
+    def _rank(self, index) -> float:
+        samples = self.samples[index]
+        if samples == 0:
+            return 0.0
+        cost = self.elapsed[index] / samples
+        # the proportion of the records the term decides the result for
+        decided = self.passed[index] / samples
+        if self.is_and:
+            decided = 1 - decided
+        if decided == 0:
+            return float("inf")
+        return cost / decided
+
+    def _reorder(self):
+        self.order = sorted(self.order, key=self._rank)
+        self.ordered = tuple(self.terms[index] for index in self.order)
+
+    def statistics(self) -> List[dict]:
+        """
+        How the terms have performed, in the order they're evaluated.
+        """
+        return [
+            {
+                "term": self.labels[index],
+                "operator": "AND" if self.is_and else "OR",
+                "samples": self.samples[index],
+                "pass_rate": (
+                    self.passed[index] / self.samples[index] if self.samples[index] else None
+                ),
+                "mean_ns": (
+                    self.elapsed[index] / self.samples[index] if self.samples[index] else None
+                ),
+            }
+            for index in self.order
+        ]
@@ -21,6 +21,7 @@ WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 See the License for the specific language governing permissions and
 limitations under the License.
 """
+
 # python setup.py build_ext --inplace
 
 import os
@@ -111,6 +112,21 @@ class DictSet(object):
         if not hasattr(self._iterator, "__iter__"):  # pragma:no cover
             self._iterator = DumbIterator(self._iterator)
 
+    def _push_down(self, **operation):
+        """
+        If this DictSet is a Reader which hasn't been read, create a DictSet from
+        a Reader which applies the operation as it reads, see `push_down` on the
+        Reader. Returns None if the operation can't be pushed down.
+        """
+        if self.storage_class != STORAGE_CLASS.NO_PERSISTANCE:
+            return None
+        if not hasattr(self._iterator, "push_down"):
+            return None
+        reader = self._iterator.push_down(**operation)
+        if reader is None:
+            return None
+        return DictSet(reader, storage_class=self.storage_class)
+
     def __iter__(self):
         """
         Wrap the iterator in a Iterable object
@@ -386,6 +402,9 @@ class DictSet(object):
         Return the first _items_ number of items from the _DictSet_. This loads
         these items into memory. If returning a large number of items, use itake.
         """
+        pushed = self._push_down(limit=items) if items > 0 else None
+        if pushed is not None:
+            return DictSet(pushed.itake(items), storage_class=self.storage_class)
         return DictSet(self.itake(items), storage_class=self.storage_class)
 
     def itake(self, items: int):
@@ -412,6 +431,11 @@ class DictSet(object):
                 A function that takes a record as a parameter and should return
                 False for items to be filtered
         """
+        if isinstance(filters, (str, tuple, list)):
+            pushed = self._push_down(filters=filters)
+            if pushed is not None:
+                return pushed
+
         # Where clause filtering
         if isinstance(filters, str):
 
@@ -470,6 +494,11 @@ class DictSet(object):
         if not isinstance(columns, (list, set, tuple)):
             columns = list([columns])
 
+        if "*" not in columns:
+            pushed = self._push_down(select=list(columns))
+            if pushed is not None:
+                return pushed
+
         if "*" in columns:
 
             def inner_select(it):
@@ -3,13 +3,21 @@ This is a filtering mechanism to be applied when reading data.
 """
 
 import operator
+import re
 from typing import Iterable
 from typing import List
 from typing import Optional
 from typing import Tuple
 from typing import Union
 
+from mabel.data.internals.adaptive_terms import PASS_RATES
+from mabel.data.internals.adaptive_terms import AdaptiveTerms
+from mabel.data.internals.adaptive_terms import combined_pass_rate
+from mabel.data.internals.adaptive_terms import evaluate_in_order
+from mabel.data.internals.adaptive_terms import static_order
+from mabel.data.internals.adaptive_terms import worth_adapting
 from mabel.errors import InvalidSyntaxError
+from mabel.utils.text import _sql_like_fragment_to_regex
 from mabel.utils.text import like
 from mabel.utils.text import matches
 
@@ -75,8 +83,181 @@ def evaluate(predicate: Union[tuple, list], record: dict) -> bool:
     raise InvalidSyntaxError("Unable to evaluate Filter")  # pragma: no cover
 
 
+# the relative cost of evaluating the operators, cheaper predicates are evaluated
+# first in a set of ANDed predicates
+COSTS = {"like": 2, "matches": 3, "~": 3, "contains": 2, "!contains": 2}
+# the collection types `in` is evaluated against as a set
+SET_TYPES = (list, tuple, set, frozenset)
+
+
+def _like_checker(pattern: str):
+    """
+    A function which does the same as `like`, with the pattern lower-cased and
+    compiled once. Patterns with `%` wildcards only at their ends are checked without
+    a regex, unless the value has a line break, which `.` doesn't match.
+    """
+    pattern = pattern.lower()
+    regex = _sql_like_fragment_to_regex(pattern)
+    inner = pattern.strip("%")
+    if "_" in inner or "%" in inner:
+        return (lambda value: regex.match(str(value).lower())), COSTS["like"] + 1
+
+    starts, ends = pattern.startswith("%"), pattern.endswith("%")
+    if starts and ends:
+        check = lambda value: inner in value
+    elif ends:
+        check = lambda value: value.startswith(inner)
+    elif starts:
+        check = lambda value: value.endswith(inner)
+    else:
+        check = lambda value: value == inner
+
+    def like_checker(value):
+        value = str(value).lower()
+        if "\n" in value:
+            return regex.match(value)
+        return check(value)
+
+    return like_checker, COSTS["like"]
+
+
+def _compile_predicate(predicate: tuple):
+    """
+    Create a function which evaluates a single (`key`, `op`, `value`) predicate,
+    and the relative cost of running it.
+    """
+    if len(predicate) != 3 or str(predicate[1]).lower() not in OPERATORS:
+        # raise the same error as evaluating it
+        return (lambda record: evaluate(predicate, record)), 1
+    key, op, value = predicate
+    op = op.lower()
+
+    if op in ("in", "!in", "not in") and isinstance(value, SET_TYPES):
+        collection = value
+        try:
+            value = frozenset(collection)
+        except TypeError:
+            pass
+        else:
+
+            def is_in(record_value):
+                try:
+                    return record_value in value
+                except TypeError:  # unhashable values
+                    return record_value in collection
+
+            function = is_in if op == "in" else lambda record_value: not is_in(record_value)
+
+            def in_predicate(record):
+                record_value = record.get(key, None)
+                return record_value is not None and function(record_value)
+
+            return in_predicate, 1
+
+    try:
+        if op == "like":
+            function, cost = _like_checker(value)
+        elif op in ("matches", "~"):
+            pattern = re.compile(value)
+            function, cost = (lambda record_value: pattern.search(record_value) != None), COSTS[op]
+        else:
+            operator_function = OPERATORS[op]
+            function = lambda record_value: operator_function(record_value, value)
+            cost = COSTS.get(op, 1)
+    except Exception:
+        # the value isn't a pattern, raise the same error as evaluating it
+        return (lambda record: evaluate(predicate, record)), 1
+
+    def compiled_predicate(record):
+        record_value = record.get(key, None)
+        return record_value is not None and function(record_value)
+
+    return compiled_predicate, cost
+
+
+def _label(predicates) -> str:
+    if isinstance(predicates, tuple) and len(predicates) == 3:
+        key, op, value = predicates
+        return f"{key} {op} {value!r}"
+    if isinstance(predicates, list) and len(predicates) == 1:
+        return _label(predicates[0])
+    if isinstance(predicates, list) and all(isinstance(p, tuple) for p in predicates):
+        return "(" + " AND ".join(_label(p) for p in predicates) + ")"
+    return str(predicates)
+
+
+def _pass_rate(predicate: tuple) -> Optional[float]:
+    if len(predicate) != 3 or not isinstance(predicate[1], str):
+        return None
+    return PASS_RATES.get(predicate[1].lower())
+
+
+def _compile_terms(predicates: Union[tuple, list], adaptive: Optional[list]):
+    """
+    Compile predicates in DNF, returning the function, its relative cost and a guess
+    at how often it passes (None if we can't guess).
+    """
+    if isinstance(predicates, tuple):
+        function, cost = _compile_predicate(predicates)
+        return function, cost, _pass_rate(predicates)
+
+    if isinstance(predicates, list) and predicates:
+        is_and = all(isinstance(p, tuple) for p in predicates)
+        if is_and or all(isinstance(p, list) for p in predicates):
+            compiled = [_compile_terms(p, adaptive) for p in predicates]
+            if len(compiled) == 1:
+                return compiled[0]
+            functions = [function for function, cost, pass_rate in compiled]
+            costs = [cost for function, cost, pass_rate in compiled]
+            pass_rates = [pass_rate for function, cost, pass_rate in compiled]
+            cost, pass_rate = sum(costs), combined_pass_rate(pass_rates, is_and)
+
+            if not worth_adapting(costs, pass_rates):
+                # the terms cost the same and we can guess how often they pass, so
+                # the best order is known up front
+                order = static_order(pass_rates, is_and)
+                function = evaluate_in_order([functions[i] for i in order], is_and)
+                return function, cost, pass_rate
+
+            # ANDed predicates start cheapest first
+            order = list(range(len(functions)))
+            if is_and:
+                order.sort(key=lambda index: costs[index])
+            terms = AdaptiveTerms(
+                [functions[i] for i in order],
+                [_label(predicates[i]) for i in order],
+                is_and=is_and,
+                fallback=lambda record: evaluate(predicates, record),
+            )
+            if adaptive is not None:
+                adaptive.append(terms)
+            return terms, cost, pass_rate
+
+    # raise the same error as evaluating it
+    return (lambda record: evaluate(predicates, record)), 1, None
+
+
+def compile_predicates(predicates: Union[tuple, list], adaptive: Optional[list] = None):
+    """
+    Create a function which evaluates predicates in DNF, the same as `evaluate`.
+
+    The structure of the predicates is worked out once, rather than for each record,
+    and the values the predicates compare to are prepared, e.g. `in` collections
+    are made sets and `like` patterns are compiled.
+
+    ANDed and ORed predicates which cost different amounts to run, or which we can't
+    guess how often pass, are reordered by how they perform, see `AdaptiveTerms`,
+    which are added to the `adaptive` list if it's given; ANDed predicates start
+    cheapest first. Other predicates are put in order once, the predicates most
+    likely to decide the result first. If a predicate raises an error the
+    predicates are run again in the order they were written, so the same errors
+    are raised.
+    """
+    return _compile_terms(predicates, adaptive)[0]
+
+
 class DnfFilters:
-    __slots__ = ("empty_filter", "predicates")
+    __slots__ = ("empty_filter", "predicates", "_evaluator", "_adaptive")
 
     def __init__(self, filters: Optional[List[Tuple[str, str, object]]] = None):
         """
@@ -104,6 +285,17 @@ class DnfFilters:
         """
         self.empty_filter = filters is None
         self.predicates = filters if filters else []
+        self._adaptive: list = []
+        self._evaluator = compile_predicates(self.predicates, self._adaptive)
+
+    def __getstate__(self):
+        # the compiled predicates are closures, which can't be pickled
+        return (self.empty_filter, self.predicates)
+
+    def __setstate__(self, state):
+        self.empty_filter, self.predicates = state
+        self._adaptive = []
+        self._evaluator = compile_predicates(self.predicates, self._adaptive)
 
     def filter_dictset(self, dictset: Iterable[dict]) -> Iterable:
         """
@@ -119,7 +311,28 @@ class DnfFilters:
         if self.empty_filter:
             yield from dictset
         else:
-            yield from (record for record in dictset if evaluate(self.predicates, record))
+            yield from filter(self._evaluator, dictset)
+
+    def variables(self) -> set:
+        """
+        The names of the fields read from the records when evaluating.
+        """
+
+        def _inner_variables(predicate):
+            if isinstance(predicate, tuple):
+                yield predicate[0]
+            elif isinstance(predicate, list):
+                for p in predicate:
+                    yield from _inner_variables(p)
+
+        return set(_inner_variables(self.predicates))
+
+    def statistics(self) -> List[dict]:
+        """
+        How the ANDed and ORed predicates have performed while filtering, see
+        `AdaptiveTerms.statistics`.
+        """
+        return [entry for terms in self._adaptive for entry in terms.statistics()]
 
     def __call__(self, record) -> bool:
-        return evaluate(self.predicates, record)
+        return self._evaluator(record)
@@ -15,17 +15,201 @@ expression tree as it's only doing boolean logic.
 
 Derived from: https://gist.github.com/leehsueh/1290686
 """
+
+from mabel.data.internals.adaptive_terms import PASS_RATES
+from mabel.data.internals.adaptive_terms import AdaptiveTerms
+from mabel.data.internals.adaptive_terms import combined_pass_rate
+from mabel.data.internals.adaptive_terms import evaluate_in_order
+from mabel.data.internals.adaptive_terms import static_order
+from mabel.data.internals.adaptive_terms import worth_adapting
 from mabel.data.readers.internals.inline_evaluator import *
 from mabel.utils.dates import parse_iso
+from mabel.utils.token_labeler import COLUMN_OPERATORS
 from mabel.utils.token_labeler import OPERATORS
 from mabel.utils.token_labeler import TOKENS
 from mabel.utils.token_labeler import Tokenizer
+from mabel.utils.token_labeler import interpret_value
+
+LITERAL_TOKENS = {
+    TOKENS.INTEGER,
+    TOKENS.FLOAT,
+    TOKENS.LITERAL,
+    TOKENS.BOOLEAN,
+    TOKENS.NULL,
+    TOKENS.DATE,
+}
+NUMBER_STARTS = set("+-.iInN")
+# the operators where the result for values which aren't None, compared to None,
+# doesn't depend on the value
+NULL_COMPARISONS = {"=", "==", "!=", "<>", "IS", "IS NOT", "<", ">", "<=", ">="}
 
 
 class InvalidExpression(BaseException):
     pass
 
 
+def _variable_name(name):
+    if name[0] == name[-1] == "`":
+        return name[1:-1]
+    return name
+
+
+def _interpret_value(value):
+    """
+    Convert strings which look like booleans, numbers and dates to those types.
+    """
+    if not isinstance(value, str):
+        return value
+    upper = value.upper()
+    if upper == "TRUE" or upper == "FALSE":
+        return upper == "TRUE"
+
+    # int and float only accept strings starting with a digit, a sign, a point or
+    # inf/nan once whitespace is removed, trying them raises for anything else
+    start = value.lstrip()[:1]
+    if start and (start.isdecimal() or start in NUMBER_STARTS):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+
+        try:
+            return float(value)
+        except ValueError:
+            pass
+
+    return parse_iso(value) or value
+
+
+def _candidates(values):
+    # the candidates of IN are the same for every record, work them out once
+    return [interpret_value(i) for i in values if str(i).strip() != ","]
+
+
+def _in_operator(candidates):
+    try:
+        candidate_set = frozenset(candidates)
+    except TypeError:
+        candidate_set = None
+
+    def function_in(x, y):
+        if candidate_set is not None:
+            try:
+                return x in candidate_set
+            except TypeError:
+                pass
+        return x in candidates
+
+    return function_in
+
+
+def _result_of(op, left, right):
+    """
+    The truth of a comparison as it is when evaluating a record, None if it raises.
+    """
+    try:
+        return bool(op(left, right))
+    except (TypeError, ValueError):
+        return False
+    except Exception:  # the error is raised when the record is evaluated
+        return None
+
+
+def _chain(treeNode, token_type):
+    """
+    The terms of a chain of ANDs, or of ORs, in the order they were written.
+    """
+    if treeNode.token_type != token_type:
+        return [treeNode]
+    return _chain(treeNode.left, token_type) + _chain(treeNode.right, token_type)
+
+
+def _describe(treeNode):
+    """
+    Write a tree back out as an expression, to describe it.
+    """
+    token_type = treeNode.token_type
+    if token_type in (TOKENS.AND, TOKENS.OR):
+        joiner = " AND " if token_type == TOKENS.AND else " OR "
+        return "(" + joiner.join(_describe(node) for node in _chain(treeNode, token_type)) + ")"
+    if token_type == TOKENS.NOT:
+        return f"NOT {_describe(treeNode.left)}"
+    if token_type == TOKENS.OPERATOR:
+        return f"{_describe(treeNode.left)} {treeNode.value} {_describe(treeNode.right)}"
+    if token_type == TOKENS.LITERAL:
+        if isinstance(treeNode.value, list):
+            return "(" + ", ".join(str(value) for value in treeNode.value) + ")"
+        return f"'{treeNode.value}'"
+    if token_type == TOKENS.DATE:
+        return f"'{treeNode.value.isoformat()}'"
+    return str(treeNode.value)
+
+
+def _pass_rate(treeNode):
+    """
+    A guess at how often a tree is true, None if we can't guess.
+    """
+    token_type = treeNode.token_type
+    if token_type in (TOKENS.AND, TOKENS.OR):
+        nodes = _chain(treeNode, token_type)
+        return combined_pass_rate([_pass_rate(node) for node in nodes], token_type == TOKENS.AND)
+    if token_type == TOKENS.NOT:
+        pass_rate = _pass_rate(treeNode.left)
+        return None if pass_rate is None else 1 - pass_rate
+    if token_type == TOKENS.OPERATOR and treeNode.right.token_type in LITERAL_TOKENS:
+        return PASS_RATES.get(treeNode.value)
+    return None
+
+
+def _constant(value, size):
+    import pyarrow  # type:ignore
+
+    return pyarrow.repeat(value, size)
+
+
+def _unknown(columns):
+    return _constant(False, columns.num_rows), _constant(False, columns.num_rows)
+
+
+def _and_masks(left, right):
+    # None is a mask with every row set
+    import pyarrow.compute as pc  # type:ignore
+
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return pc.and_(left, right)
+
+
+def _or_masks(left, right):
+    import pyarrow.compute as pc  # type:ignore
+
+    if left is None or right is None:
+        return None
+    return pc.or_(left, right)
+
+
+def _plain_strings(column):
+    """
+    The rows of a string column which aren't changed by `_interpret_value`, None
+    if the column isn't strings.
+
+    Strings starting with a letter can't be numbers or dates, other than `inf`,
+    `nan` and the booleans, so only those are plain.
+    """
+    import pyarrow  # type:ignore
+    import pyarrow.compute as pc  # type:ignore
+
+    if not (pyarrow.types.is_string(column.type) or pyarrow.types.is_large_string(column.type)):
+        return None
+    plain = pc.utf8_is_alpha(pc.utf8_slice_codeunits(column, 0, 1))
+    prefix = pc.utf8_lower(pc.utf8_slice_codeunits(column, 0, 3))
+    numbers = pc.is_in(prefix, value_set=pyarrow.array(["inf", "nan"]))
+    booleans = pc.is_in(pc.utf8_upper(column), value_set=pyarrow.array(["TRUE", "FALSE"]))
+    return pc.and_(plain, pc.invert(pc.or_(numbers, booleans)))
+
+
 class TreeNode:
     __slots__ = ("token_type", "value", "left", "right", "parameters")
 
@@ -44,6 +228,9 @@ class Expression(object):
     def __init__(self, exp):
         self.tokenizer = Tokenizer(exp)
         self.parse()
+        self._adaptive = []
+        self._evaluator = self._compile(self.root)
+        self._column_evaluator = self._compile_columns(self.root)
 
     def parse(self):
         self.root = self.parse_expression()
@@ -189,67 +376,321 @@ class Expression(object):
         raise InvalidExpression(f"Unexpected token, got `{self.tokenizer.next()}`")
 
     def interpret_value(self, value):
-        if not isinstance(value, str):
-            return value
-        if value.upper() in ("TRUE", "FALSE"):
-            return value.upper() == "TRUE"
-
-        try:
-            num = int(value)
-            return num
-        except ValueError:
-            pass
-
-        try:
-            num = float(value)
-            return num
-        except ValueError:
-            pass
-
-        return parse_iso(value) or value
+        return _interpret_value(value)
 
     def evaluate(self, variable_dict):
-        return self.evaluate_recursive(self.root, variable_dict)
+        return self._evaluator(variable_dict)
 
     def __call__(self, variable_dict):
-        return self.evaluate_recursive(self.root, variable_dict)
+        return self._evaluator(variable_dict)
+
+    def __getstate__(self):
+        # the compiled evaluator is made of closures, which can't be pickled
+        state = self.__dict__.copy()
+        state.pop("_evaluator", None)
+        state.pop("_column_evaluator", None)
+        state.pop("_adaptive", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._adaptive = []
+        self._evaluator = self._compile(self.root)
+        self._column_evaluator = self._compile_columns(self.root)
+
+    def _compile(self, treeNode):
+        """
+        Build a function which evaluates the tree for a record.
 
-    def evaluate_recursive(self, treeNode, variable_dict):
-        if treeNode.token_type in (
-            TOKENS.INTEGER,
-            TOKENS.FLOAT,
-            TOKENS.LITERAL,
-            TOKENS.BOOLEAN,
-            TOKENS.NULL,
-            TOKENS.DATE,
+        The tree is walked once, the variable names and the literal values are
+        resolved and the operators looked up here rather than for each record.
+        """
+        token_type = treeNode.token_type
+
+        if token_type in LITERAL_TOKENS:
+            value = treeNode.value
+            return lambda variable_dict: value
+
+        if token_type == TOKENS.VARIABLE:
+            name = _variable_name(treeNode.value)
+
+            def variable(variable_dict):
+                try:
+                    return _interpret_value(variable_dict[name])
+                except KeyError:
+                    return None
+
+            return variable
+
+        if token_type == TOKENS.NOT:
+            operand = self._compile(treeNode.left)
+            return lambda variable_dict: not operand(variable_dict)
+
+        if token_type in (TOKENS.AND, TOKENS.OR):
+            # a chain of ANDs or ORs is evaluated as one set of terms which can be
+            # reordered, if a term raises an error they're evaluated as written
+            nodes = _chain(treeNode, token_type)
+            functions = [self._compile(node) for node in nodes]
+            is_and = token_type == TOKENS.AND
+
+            # if we can guess how often each term is true, the best order is known
+            # up front and the terms don't need to be reordered as they're evaluated
+            pass_rates = [_pass_rate(node) for node in nodes]
+            if not worth_adapting([1] * len(nodes), pass_rates):
+                order = static_order(pass_rates, is_and)
+                return evaluate_in_order([functions[i] for i in order], is_and)
+
+            terms = AdaptiveTerms(
+                functions,
+                [_describe(node) for node in nodes],
+                is_and=is_and,
+                fallback=evaluate_in_order(functions, is_and),
+            )
+            self._adaptive.append(terms)
+            return terms
+
+        if token_type == TOKENS.OPERATOR:
+            return self._compile_comparison(treeNode)
+
+        raise InvalidExpression(f"Unexpected value of type `{str(token_type)}`")
+
+    def _compile_comparison(self, treeNode):
+        op = OPERATORS[treeNode.value]
+        left = self._compile(treeNode.left)
+        if treeNode.right.token_type not in LITERAL_TOKENS:
+            right = self._compile(treeNode.right)
+
+            def compare(variable_dict):
+                try:
+                    return op(left(variable_dict), right(variable_dict))
+                except (TypeError, ValueError):
+                    return None
+
+            return compare
+
+        value = treeNode.right.value
+
+        if treeNode.value == "IN" and isinstance(value, list):
+            op = _in_operator(_candidates(value))
+
+        elif (
+            treeNode.value in ("=", "==", "!=", "<>")
+            and treeNode.left.token_type == TOKENS.VARIABLE
+            and isinstance(value, str)
+            and _interpret_value(value) is value
         ):
-            return treeNode.value
-        if treeNode.token_type == TOKENS.VARIABLE:
-            if treeNode.value[0] == treeNode.value[-1] == "`":
-                treeNode.value = treeNode.value[1:-1]
-            if treeNode.value in variable_dict:
-                value = variable_dict[treeNode.value]
-                return self.interpret_value(value)
-            return None
-
-        left = self.evaluate_recursive(treeNode.left, variable_dict)
+            # A string which doesn't look like a number, boolean or date is only
+            # equal to the same string, or something which is interpreted as the
+            # same string, so the field doesn't need interpreting.
+            name = _variable_name(treeNode.left.value)
 
-        if treeNode.token_type == TOKENS.NOT:
-            return not left
+            def compare_string(variable_dict):
+                try:
+                    return op(variable_dict[name], value)
+                except KeyError:
+                    return op(None, value)
 
-        right = self.evaluate_recursive(treeNode.right, variable_dict)
+            return compare_string
 
-        if treeNode.token_type == TOKENS.OPERATOR:
+        def compare_literal(variable_dict):
             try:
-                return OPERATORS[treeNode.value](left, right)
+                return op(left(variable_dict), value)
             except (TypeError, ValueError):
                 return None
-        if treeNode.token_type == TOKENS.AND:
-            return left and right
-        if treeNode.token_type == TOKENS.OR:
-            return left or right
 
-        raise InvalidExpression(f"Unexpected value of type `{str(treeNode.token_type)}`")
+        return compare_literal
+
+    def evaluate_columns(self, columns):
+        """
+        Evaluate the expression for all of the rows in a set of columns at once.
+
+        The comparisons are run over whole columns with the Arrow compute kernels
+        and combined as masks. The rows the kernels can't give the same result as
+        evaluating the records would, for example strings which are interpreted
+        as numbers, are evaluated as records.
+
+        Parameters:
+            columns: pyarrow.RecordBatch, pyarrow.Table or dictionary
+                The columns to evaluate, a dictionary of names to arrays, such as
+                numpy arrays, is converted to a Table
+
+        Returns:
+            pyarrow.BooleanArray, True for the rows the expression is true for
+        """
+        import pyarrow  # type:ignore
+        import pyarrow.compute as pc  # type:ignore
+
+        if isinstance(columns, dict):
+            columns = pyarrow.table(columns)
+        truth, known = self._column_evaluator(columns)
+        if isinstance(truth, pyarrow.ChunkedArray):
+            truth = truth.combine_chunks()
+        if known is None:
+            return truth
+        if isinstance(known, pyarrow.ChunkedArray):
+            known = known.combine_chunks()
+
+        unknown = pc.invert(known)
+        indices = pc.indices_nonzero(unknown)
+        if len(indices) == 0:
+            return truth
+        records = columns.take(indices).to_pylist()
+        results = pyarrow.array([bool(self._evaluator(record)) for record in records])
+        return pc.replace_with_mask(truth, unknown, results)
+
+    def _compile_columns(self, treeNode):
+        """
+        Build a function which evaluates the tree for a set of columns.
+
+        The function returns a boolean array of the result for each row and a mask
+        of the rows the result is known for, None if it's known for all of them.
+        """
+        token_type = treeNode.token_type
+
+        if token_type == TOKENS.NOT:
+            operand = self._compile_columns(treeNode.left)
+
+            def evaluate_not(columns):
+                import pyarrow.compute as pc  # type:ignore
+
+                truth, known = operand(columns)
+                return pc.invert(truth), known
+
+            return evaluate_not
+
+        if token_type in (TOKENS.AND, TOKENS.OR):
+            left = self._compile_columns(treeNode.left)
+            right = self._compile_columns(treeNode.right)
+            is_and = token_type == TOKENS.AND
+
+            def evaluate_logical(columns):
+                import pyarrow.compute as pc  # type:ignore
+
+                left_truth, left_known = left(columns)
+                right_truth, right_known = right(columns)
+                if is_and:
+                    truth = pc.and_(left_truth, right_truth)
+                    # either side being false decides an AND
+                    left_decides, right_decides = pc.invert(left_truth), pc.invert(right_truth)
+                else:
+                    truth = pc.or_(left_truth, right_truth)
+                    # either side being true decides an OR
+                    left_decides, right_decides = left_truth, right_truth
+                if left_known is None and right_known is None:
+                    return truth, None
+                known = _or_masks(
+                    _and_masks(left_known, right_known),
+                    _or_masks(
+                        _and_masks(left_known, left_decides),
+                        _and_masks(right_known, right_decides),
+                    ),
+                )
+                return truth, known
+
+            return evaluate_logical
+
+        if token_type == TOKENS.OPERATOR:
+            return self._compile_column_comparison(treeNode)
+
+        return _unknown
+
+    def _compile_column_comparison(self, treeNode):
+        kernel = COLUMN_OPERATORS.get(treeNode.value)
+        if (
+            kernel is None
+            or treeNode.left.token_type != TOKENS.VARIABLE
+            or treeNode.right.token_type not in LITERAL_TOKENS
+        ):
+            return _unknown
+
+        name = _variable_name(treeNode.left.value)
+        value = treeNode.right.value
+        op = OPERATORS[treeNode.value]
+        if treeNode.value == "IN":
+            if not isinstance(value, list):
+                return _unknown
+            value = _candidates(value)
+            op = _in_operator(value)
+
+        # strings are only interpreted if they could change the result, see
+        # `_compile_comparison`
+        interpreted = not (
+            treeNode.value in ("=", "==", "!=", "<>")
+            and isinstance(value, str)
+            and _interpret_value(value) is value
+        )
+
+        # nulls and missing fields are evaluated as None
+        null_result = _result_of(op, None, value)
+        other_result = None
+        if value is None and treeNode.value in NULL_COMPARISONS:
+            other_result = _result_of(op, object(), value)
+
+        def evaluate_comparison(columns):
+            import pyarrow  # type:ignore
+            import pyarrow.compute as pc  # type:ignore
+
+            if name not in columns.schema.names:
+                if null_result is None:
+                    return _unknown(columns)
+                return _constant(null_result, columns.num_rows), None
+            column = columns.column(name)
+
+            if value is None:
+                # interpreting values never makes them None
+                if other_result is None:
+                    return _unknown(columns)
+                truth, known = _constant(other_result, columns.num_rows), None
+            else:
+                try:
+                    result = kernel(column, value)
+                except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError, TypeError):
+                    result = None
+                if result is None:
+                    return _unknown(columns)
+                truth, known = result
+                if interpreted:
+                    known = _and_masks(known, _plain_strings(column))
+
+            if column.null_count:
+                nulls = pc.is_null(column)
+                if null_result is None:
+                    known = _and_masks(known, pc.invert(nulls))
+                else:
+                    truth = pc.if_else(nulls, null_result, truth)
+                    if known is not None:
+                        known = pc.or_(known, nulls)
+            truth = pc.fill_null(truth, False)
+            if known is not None:
+                known = pc.fill_null(known, False)
+            return truth, known
+
+        return evaluate_comparison
+
+    def statistics(self):
+        """
+        How the ANDed and ORed terms have performed while filtering, see
+        `AdaptiveTerms.statistics`.
+        """
+        return [entry for terms in self._adaptive for entry in terms.statistics()]
+
+    def variables(self):
+        """
+        The names of the fields read from the records when evaluating.
+        """
+
+        def _inner_variables(treeNode):
+            if treeNode is None:
+                return
+            if treeNode.token_type == TOKENS.VARIABLE:
+                variable = treeNode.value
+                if variable[0] == variable[-1] == "`":
+                    variable = variable[1:-1]
+                yield variable
+            yield from _inner_variables(treeNode.left)
+            yield from _inner_variables(treeNode.right)
+
+        return set(_inner_variables(self.root))
 
     def to_dnf(self):
         """
@@ -0,0 +1,275 @@
+"""
+Indexes are sidecar files written alongside data blobs which map the values in a
+column to the positions of the rows holding those values. They allow the reader
+to skip blobs which cannot contain matching rows, and to only parse the rows in a
+blob which might match.
+
+The index is a sorted list of fixed-width entries:
+
+┌──────────────────────┬──────────────────┐
+│ value hash (8 bytes) │ row (4 bytes)    │
+└──────────────────────┴──────────────────┘
+
+Values are hashed, so an index can return rows which don't match (a hash
+collision), but it never misses rows which do match - the full filter must still
+be applied to the rows the index returns.
+"""
+
+import numbers
+import struct
+from typing import Iterable
+from typing import Optional
+from typing import Set
+
+from xxhash import xxh3_64_intdigest
+
+from mabel.data.internals.expression import Expression
+from mabel.data.internals.expression import TreeNode
+from mabel.utils.token_labeler import TOKENS
+from mabel.utils.token_labeler import interpret_value
+
+STRUCT_DEF = "<QI"  # 8 + 4 = 12 bytes
+RECORD_SIZE = struct.calcsize(STRUCT_DEF)
+MAX_ROWS = 4294967295  # 2^32 - 1
+
+INDEXABLE_TYPES = (str, int, float, bool)
+EQUALS_OPERATORS = {"=", "=="}
+IN_OPERATORS = {"in"}
+
+
+def _canonical(value) -> bytes:
+    """
+    Values which compare as equal in Python need to hash to the same value, so
+    1, 1.0 and True all become b"1".
+    """
+    if isinstance(value, bool):
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).encode()
+
+
+def _indexable(value):
+    """
+    The value to index for a value read from a record, None if it isn't indexed.
+
+    Numbers of other types, e.g. Decimals and numpy scalars, are indexed as the int
+    or float they're equal to, so searching for an int or float finds them. Other
+    values, e.g. dates, lists and complex numbers, are never equal to the values the
+    index is searched for, so they aren't indexed.
+    """
+    if isinstance(value, INDEXABLE_TYPES):
+        return value
+    if type(value).__module__ == "numpy":
+        try:
+            value = value.item()
+        except (AttributeError, ValueError):  # pragma: no cover
+            return None
+        if isinstance(value, INDEXABLE_TYPES):
+            return value
+    if isinstance(value, numbers.Number) and not isinstance(value, complex):
+        try:
+            integer = int(value)
+            return integer if integer == value else float(value)
+        except (TypeError, ValueError, OverflowError):
+            return None
+    return None
+
+
+def hash_value(value) -> int:
+    return xxh3_64_intdigest(_canonical(value), 0)
+
+
+class IndexBuilder:
+    def __init__(self, column_name: str):
+        """
+        Collect the values of a column so an Index can be built over them.
+
+        Parameters:
+            column_name: string
+                The name of the column to index
+        """
+        self.column_name = column_name
+        self.entries: list = []
+
+    def add(self, position: int, record: dict):
+        """
+        Add the value of the indexed column from a record at a given row position,
+        rows without the column, or with values which aren't indexed, are skipped,
+        see `_indexable`.
+        """
+        if position > MAX_ROWS or not hasattr(record, "get"):  # pragma: no cover
+            return
+        value = _indexable(record.get(self.column_name))
+        if value is not None:
+            self.entries.append((hash_value(value), position))
+
+    def build(self) -> "Index":
+        self.entries.sort()
+        buffer = bytearray(RECORD_SIZE * len(self.entries))
+        for offset, entry in enumerate(self.entries):
+            struct.pack_into(STRUCT_DEF, buffer, offset * RECORD_SIZE, *entry)
+        return Index(bytes(buffer))
+
+
+class Index:
+    def __init__(self, index: bytes):
+        """
+        A searchable index over a single column of a blob.
+
+        Parameters:
+            index: bytes
+                The index, as written by the IndexBuilder
+        """
+        self._index = memoryview(index)
+        self.size = len(index) // RECORD_SIZE
+
+    @staticmethod
+    def build_index(dictset: Iterable[dict], column_name: str) -> "Index":
+        builder = IndexBuilder(column_name)
+        for position, record in enumerate(dictset):
+            builder.add(position, record)
+        return builder.build()
+
+    def _hash_at(self, location: int) -> int:
+        return struct.unpack_from(STRUCT_DEF, self._index, location * RECORD_SIZE)[0]
+
+    def _locate(self, value_hash: int) -> int:
+        # binary search for the first entry with this hash
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self._hash_at(middle) < value_hash:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def search(self, values: Iterable) -> Set[int]:
+        """
+        Return the set of row positions which may hold any of the values.
+        """
+        rows: Set[int] = set()
+        for value in values:
+            value_hash = hash_value(value)
+            location = self._locate(value_hash)
+            while location < self.size:
+                entry_hash, row = struct.unpack_from(
+                    STRUCT_DEF, self._index, location * RECORD_SIZE
+                )
+                if entry_hash != value_hash:
+                    break
+                rows.add(row)
+                location += 1
+        return rows
+
+    def bytes(self) -> bytes:
+        return self._index.tobytes()
+
+
+def _search_predicate(indexes: dict, column, operator, value) -> Optional[Set[int]]:
+    """
+    Search for a single (column, operator, value) predicate, returns None if the
+    predicate can't be answered by the available indexes.
+    """
+    index = indexes.get(column)
+    if index is None or not isinstance(operator, str):
+        return None
+    operator = operator.lower()
+    if operator in EQUALS_OPERATORS and isinstance(value, INDEXABLE_TYPES):
+        return index.search([value])
+    if (
+        operator in IN_OPERATORS
+        and isinstance(value, (list, tuple, set, frozenset))
+        and all(isinstance(v, INDEXABLE_TYPES) for v in value)
+    ):
+        return index.search(value)
+    return None
+
+
+def _search_dnf(indexes: dict, predicate) -> Optional[Set[int]]:
+    if isinstance(predicate, tuple):
+        if len(predicate) != 3:
+            return None
+        return _search_predicate(indexes, *predicate)
+
+    if isinstance(predicate, list) and len(predicate) > 0:
+        results = [_search_dnf(indexes, p) for p in predicate]
+        answered = [r for r in results if r is not None]
+        # lists of lists are ORs - we need to read rows matching any of them
+        if all(isinstance(p, list) for p in predicate):
+            if len(answered) < len(results):
+                return None
+            return set().union(*answered)
+        # otherwise they're ANDs - rows must match all of the predicates we can
+        # answer, predicates we can't answer don't restrict the rows
+        if not answered:
+            return None
+        return set.intersection(*answered)
+
+    return None
+
+
+def _search_expression(indexes: dict, node: Optional[TreeNode]) -> Optional[Set[int]]:
+    if node is None:
+        return None
+
+    if node.token_type == TOKENS.AND:
+        left = _search_expression(indexes, node.left)
+        right = _search_expression(indexes, node.right)
+        if left is None:
+            return right
+        if right is None:
+            return left
+        return left.intersection(right)
+
+    if node.token_type == TOKENS.OR:
+        left = _search_expression(indexes, node.left)
+        right = _search_expression(indexes, node.right)
+        if left is None or right is None:
+            return None
+        return left.union(right)
+
+    if (
+        node.token_type == TOKENS.OPERATOR
+        and node.left.token_type == TOKENS.VARIABLE
+        and node.right.token_type == TOKENS.LITERAL
+    ):
+        column = node.left.value
+        if column[0] == column[-1] == "`":
+            column = column[1:-1]
+        value = node.right.value
+        # Expressions interpret the values read from records, so numbers and dates
+        # held in strings are converted before they're compared - we only use the
+        # index for string literals where this conversion can't change the result
+        if node.value in EQUALS_OPERATORS and isinstance(value, str):
+            return _search_predicate(indexes, column, node.value, value)
+        if node.value == "IN" and isinstance(value, list):
+            candidates = [interpret_value(v) for v in value if str(v).strip() != ","]
+            if all(isinstance(c, str) for c in candidates):
+                return _search_predicate(indexes, column, "in", candidates)
+
+    return None
+
+
+def search_indexes(indexes: dict, filters) -> Optional[Set[int]]:
+    """
+    Use a set of indexes to find the rows which may satisfy a filter.
+
+    Parameters:
+        indexes: dictionary
+            Index objects keyed by the name of the column they index
+        filters: DnfFilters, Expression or DNF list/tuple
+            The filter being applied to the data
+
+    Returns:
+        A set of row positions, or None if the indexes can't be used to answer
+        the filter and all of the rows need to be read.
+    """
+    if not indexes or filters is None:
+        return None
+    if isinstance(filters, Expression):
+        return _search_expression(indexes, filters.root)
+    if hasattr(filters, "predicates"):
+        filters = filters.predicates
+    return _search_dnf(indexes, filters)
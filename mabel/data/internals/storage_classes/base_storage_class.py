@@ -33,6 +33,8 @@ class BaseStorageClass(ABC):
         def handler(obj):
             if isinstance(obj, decimal.Decimal):
                 return str(obj)
+            if hasattr(obj, "as_dict"):
+                return obj.as_dict()
             raise TypeError
 
         return orjson.dumps(ds, default=handler)
@@ -3,18 +3,29 @@ Base Inner Reader
 """
 
 import abc
+import asyncio
 import datetime
 import io
 import pathlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import IOBase
 from typing import Iterable
+from typing import Optional
 
 from orso.logging import get_logger
 
 from mabel.utils import dates
 from mabel.utils import paths
 
+from .blob_cache import CACHE_SIZE
+from .blob_cache import BlobCache
+from .listing_cache import CURRENT_PARTITION_TTL
+from .listing_cache import LISTING_CACHE
+from .listing_cache import PAST_PARTITION_TTL
+
 BUFFER_SIZE: int = 64 * 1024 * 1024  # 64Mb
+MAX_CONCURRENCY: int = 32
 
 
 class BaseInnerReader(abc.ABC):
@@ -31,7 +42,16 @@ class BaseInnerReader(abc.ABC):
             if part.startswith("by_"):
                 return part
 
-    def __init__(self, partitions=None, partition_filter=None, **kwargs):
+    def __init__(
+        self,
+        partitions=None,
+        partition_filter=None,
+        cache_listings=False,
+        blob_cache_directory=None,
+        blob_cache_size=CACHE_SIZE,
+        max_concurrency=MAX_CONCURRENCY,
+        **kwargs,
+    ):
         today = datetime.datetime.utcnow().replace(minute=0, second=0, microsecond=0)
 
         self.dataset = kwargs.get("dataset")
@@ -44,6 +64,19 @@ class BaseInnerReader(abc.ABC):
         if partitions:
             self.dataset += "/".join(partitions) + "/"
         self.partition_filter = partition_filter
+        self.cache_listings = cache_listings
+
+        # blobs in complete frames can't change, so they can be cached
+        self.blob_cache = None
+        if blob_cache_directory:
+            self.blob_cache = BlobCache(blob_cache_directory, blob_cache_size)
+        self.immutable_blobs: set = set()
+
+        # the number of requests the async methods make to the storage at once
+        self.max_concurrency = max(max_concurrency, 1)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._semaphores: dict = {}
 
         start_date = dates.parse_iso(kwargs.get("start_date")) or today
         end_date = dates.parse_iso(kwargs.get("end_date")) or today
@@ -69,7 +102,7 @@ class BaseInnerReader(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def get_blobs_at_path(self, prefix=None) -> Iterable:
+    def get_blobs_at_path(self, path) -> Iterable:
         pass
 
     @abc.abstractmethod
@@ -79,16 +112,167 @@ class BaseInnerReader(abc.ABC):
         """
         pass
 
+    def get_blob_range(self, blob: str, start: int, length: Optional[int] = None) -> bytes:
+        """
+        Return part of a blob, `length` bytes from `start`, or the rest of the blob
+        if `length` isn't given. A negative `start` counts back from the end of the
+        blob, so `-8` is the last eight bytes.
+
+        Readers which can read part of a blob should override this, by default the
+        whole blob is read and the part we want is returned.
+        """
+        data = self.get_blob_bytes(blob)
+        if start < 0:
+            start = max(len(data) + start, 0)
+        if length is None:
+            return data[start:]
+        return data[start : start + length]
+
+    def _run_blocking(self, func, *args):
+        """
+        Run a blocking call in a thread, so it doesn't block the event loop.
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="mabel-io"
+                )
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """
+        Limits the requests in flight to `max_concurrency`, semaphores belong to an
+        event loop so there's one for each loop we're used from.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores = {loop: semaphore}
+        return semaphore
+
+    async def async_get_blobs_at_path(self, path) -> list:
+        """
+        Asynchronous version of `get_blobs_at_path`, readers with an asynchronous
+        client should override this, by default the synchronous method is run in a
+        thread.
+        """
+        async with self._semaphore():
+            return await self._run_blocking(lambda: list(self.get_blobs_at_path(path=path)))
+
+    async def async_get_blob_bytes(self, blob: str) -> bytes:
+        """
+        Asynchronous version of `get_blob_bytes`, readers with an asynchronous
+        client should override this, by default the synchronous method is run in a
+        thread.
+        """
+        async with self._semaphore():
+            return await self._run_blocking(self.get_blob_bytes, blob)
+
+    async def async_get_blob_range(
+        self, blob: str, start: int, length: Optional[int] = None
+    ) -> bytes:
+        """
+        Asynchronous version of `get_blob_range`
+        """
+        async with self._semaphore():
+            return await self._run_blocking(self.get_blob_range, blob, start, length)
+
+    def _listing_cache_key(self):
+        """
+        Identifies the storage being listed, readers which can be configured to
+        read from different stores should include that configuration.
+        """
+        return type(self).__qualname__
+
+    def _list_blobs(self, path, cycle_date) -> list:
+        """
+        List the blobs at a path, using the listing cache if it's enabled.
+        """
+        if not self.cache_listings:
+            return list(self.get_blobs_at_path(path=path))
+
+        blobs = LISTING_CACHE.get(self._listing_cache_key(), path.as_posix())
+        if blobs is None:
+            blobs = list(self.get_blobs_at_path(path=path))
+            self._cache_listing(path, cycle_date, blobs)
+        return blobs
+
+    async def _async_list_blobs(self, path, cycle_date) -> list:
+        if not self.cache_listings:
+            return await self.async_get_blobs_at_path(path)
+
+        blobs = LISTING_CACHE.get(self._listing_cache_key(), path.as_posix())
+        if blobs is None:
+            blobs = await self.async_get_blobs_at_path(path)
+            self._cache_listing(path, cycle_date, blobs)
+        return blobs
+
+    def _cache_listing(self, path, cycle_date, blobs):
+        # the partition for a past date is closed, unless the path doesn't
+        # include the date so it's the same path every day
+        today = datetime.datetime.utcnow().date()
+        current_path = paths.build_path(path=self.dataset, date=today)
+        if isinstance(cycle_date, datetime.datetime):
+            cycle_date = cycle_date.date()
+        if cycle_date < today and str(path) != str(pathlib.Path(current_path)):
+            ttl = PAST_PARTITION_TTL
+        else:
+            ttl = CURRENT_PARTITION_TTL
+        LISTING_CACHE.set(self._listing_cache_key(), path.as_posix(), blobs, ttl)
+
+    def _list_paths(self, cycle_paths: dict) -> dict:
+        """
+        List the blobs at each of the paths, the paths are listed concurrently
+        unless we're already in an event loop.
+        """
+        try:
+            asyncio.get_running_loop()
+            running = True
+        except RuntimeError:
+            running = False
+        if running or len(cycle_paths) < 2:
+            return {path: self._list_blobs(path, date) for path, date in cycle_paths.items()}
+
+        async def list_paths():
+            listings = await asyncio.gather(
+                *(self._async_list_blobs(path, date) for path, date in cycle_paths.items())
+            )
+            return dict(zip(cycle_paths, listings))
+
+        return asyncio.run(list_paths())
+
     def read_blob(self, blob: str) -> IOBase:
         """
         Read-thru cache
         """
+        if self.blob_cache is not None and blob in self.immutable_blobs:
+            return self.blob_cache.read(
+                f"{self._listing_cache_key()}/{blob}", lambda: self.get_blob_bytes(blob)
+            )
         result = self.get_blob_bytes(blob)
         return io.BytesIO(result)
 
+    async def async_read_blob(self, blob: str) -> IOBase:
+        """
+        Asynchronous version of `read_blob`
+        """
+        if self.blob_cache is not None and blob in self.immutable_blobs:
+            # the cache locks the blob while it's downloaded, so it's read in a thread
+            return await self._run_blocking(self.read_blob, blob)
+        result = await self.async_get_blob_bytes(blob)
+        return io.BytesIO(result)
+
     def get_list_of_blobs(self):
         visited = {}
         blobs = []
+        # list all of the days in the range up front, so they can be listed at once
+        cycle_paths: dict = {}
+        for cycle_date in dates.date_range(self.start_date, self.end_date):
+            cycle_path = pathlib.Path(paths.build_path(path=self.dataset, date=cycle_date))
+            cycle_paths.setdefault(cycle_path, cycle_date)
+        listings = self._list_paths(cycle_paths)
+
         # For each day in the range, get the blobs for us to read
         for cycle_date in dates.date_range(self.start_date, self.end_date):
             # Build the path name
@@ -96,7 +280,7 @@ class BaseInnerReader(abc.ABC):
             if not cycle_path in visited:
                 visited[cycle_path] = True
 
-                cycle_blobs = list(self.get_blobs_at_path(path=cycle_path))
+                cycle_blobs = listings[cycle_path]
 
                 # Remove any BACKOUT data - this is essentially a DEAD LETTER queue
                 # so we don't want to include in when reading
@@ -216,6 +400,7 @@ class BaseInnerReader(abc.ABC):
                                 for blob in partitioned_blobs
                                 if (as_at in blob) and ("/frame.complete" not in blob)
                             ]
+                            self.immutable_blobs.update(partitioned_blobs)
 
                     blobs += partitioned_blobs
 
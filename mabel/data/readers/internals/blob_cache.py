@@ -0,0 +1,143 @@
+"""
+A local disk cache of blobs, shared by all of the processes on the machine using
+the same directory.
+
+Only blobs which can't change are cached, such as the blobs in `as_at_` frames
+which have been marked as complete. Cached blobs are memory mapped rather than
+read, so they're handed to the decompressors without being copied.
+
+The cache is bounded by size, when it's full the least recently read blobs are
+removed. Downloads are locked, so processes reading the same blob at the same
+time only download it once.
+"""
+
+import io
+import mmap
+import os
+from typing import Callable
+
+from xxhash import xxh3_128_hexdigest
+
+try:
+    import fcntl
+
+    locking_available = True
+except ImportError:  # pragma: no cover
+    locking_available = False
+
+CACHE_SIZE: int = 1024 * 1024 * 1024  # 1Gb
+BLOB_SUFFIX = ".blob"
+# downloads lock one of a fixed set of lock files, so we don't leave a lock file
+# behind for every blob we've ever cached
+LOCK_STRIPES = 256
+
+
+class _DownloadLock:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        if locking_available:
+            self.file = open(self.path, "a")
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        if self.file is not None:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+
+
+class BlobCache:
+    def __init__(self, directory: str, max_size: int = CACHE_SIZE):
+        """
+        Cache blobs in a local directory.
+
+        Parameters:
+            directory: string
+                The directory to store the cached blobs in, it's created if it
+                doesn't exist
+            max_size: integer
+                The size, in bytes, the cache is allowed to grow to
+        """
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(os.path.join(self.directory, "locks"), exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, xxh3_128_hexdigest(key) + BLOB_SUFFIX)
+
+    def _lock(self, path: str) -> _DownloadLock:
+        stripe = int(os.path.basename(path)[:8], 16) % LOCK_STRIPES
+        return _DownloadLock(os.path.join(self.directory, "locks", f"{stripe}.lock"))
+
+    @staticmethod
+    def _open(path: str):
+        """
+        Memory map a cached blob, updating when it was last read.
+        """
+        os.utime(path)
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return io.BytesIO(b"")
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read(self, key: str, fetch: Callable[[], bytes]):
+        """
+        Read a blob from the cache, fetching it if it's not in the cache.
+
+        Parameters:
+            key: string
+                Identifies the blob, this must change if the content could
+            fetch: callable
+                Returns the bytes of the blob, called if the blob isn't cached
+
+        Returns:
+            A file-like object
+        """
+        path = self._path(key)
+        try:
+            return self._open(path)
+        except FileNotFoundError:
+            pass
+
+        with self._lock(path):
+            # another process may have downloaded it while we waited for the lock
+            try:
+                return self._open(path)
+            except FileNotFoundError:
+                pass
+
+            data = fetch()
+            # write to a temporary file and move it, so the blob appears whole
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            with open(temporary_path, "wb") as file:
+                file.write(data)
+            os.replace(temporary_path, path)
+
+        self.evict()
+        return io.BytesIO(data)
+
+    def evict(self):
+        """
+        Remove the least recently read blobs until the cache fits in its size.
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(BLOB_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # pragma: no cover
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:  # pragma: no cover
+                pass
+            total_size -= size
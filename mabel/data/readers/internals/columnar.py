@@ -0,0 +1,120 @@
+"""
+Filter Arrow record batches before they're converted to records.
+
+Expressions, and predicates in DNF form, are evaluated against whole columns with
+the Arrow compute kernels, the rows which can't match are removed from the batch so
+they're never converted to dictionaries.
+
+The mask is a pre-filter, it only removes rows which the row filters would also
+remove, the row filters are still applied to the rows which are left. Predicates
+which can't be run as kernels, because of the operator or because the type of the
+value doesn't match the type of the column, don't remove any rows. Nulls aren't
+removed either, the row filters decide what to do with them.
+"""
+
+from mabel.data.internals.expression import Expression
+from mabel.utils.arrow import comparable
+
+COMPUTE_OPERATORS = {
+    "=": "equal",
+    "==": "equal",
+    "is": "equal",
+    "!=": "not_equal",
+    "<>": "not_equal",
+    "<": "less",
+    ">": "greater",
+    "<=": "less_equal",
+    ">=": "greater_equal",
+}
+SET_OPERATORS = {"in": False, "!in": True, "not in": True}
+
+
+def _predicate_mask(batch, predicate):
+    """
+    The mask for a single (`key`, `op`, `value`) predicate, None if it can't be run
+    as a kernel.
+    """
+    import pyarrow  # type:ignore
+    import pyarrow.compute as pc  # type:ignore
+
+    key, op, value = predicate
+    op = op.lower()
+    if key not in batch.schema.names:
+        return None
+    column = batch.column(key)
+
+    if op in COMPUTE_OPERATORS:
+        if not comparable(column.type, value):
+            return None
+        function = COMPUTE_OPERATORS[op]
+        mask = pc.call_function(function, [column, pyarrow.scalar(value)])
+    elif op in SET_OPERATORS:
+        if not isinstance(value, (list, tuple, set)) or not all(
+            comparable(column.type, item) for item in value
+        ):
+            return None
+        mask = pc.is_in(column, value_set=pyarrow.array(list(value)))
+        if SET_OPERATORS[op]:
+            mask = pc.invert(mask)
+    else:
+        return None
+
+    return pc.fill_null(mask, True)
+
+
+def predicate_mask(batch, predicates):
+    """
+    Work out which rows in a batch may match a set of predicates in DNF form.
+
+    Parameters:
+        batch: pyarrow.RecordBatch
+            The batch to filter
+        predicates: list, tuple or Expression
+            Predicates in DNF, the same form as DnfFilters, or an Expression which
+            is evaluated over the columns
+
+    Returns:
+        A boolean array with an entry for each row, rows which are False don't
+        match the predicates. None if the predicates don't remove any rows.
+    """
+    import pyarrow  # type:ignore
+    import pyarrow.compute as pc  # type:ignore
+
+    if not predicates:
+        return None
+
+    if isinstance(predicates, Expression):
+        # fields created by the select aren't in the batch, leave them to the
+        # row filters
+        if not predicates.variables().issubset(batch.schema.names):
+            return None
+        return predicates.evaluate_columns(batch)
+
+    if isinstance(predicates, tuple):
+        try:
+            return _predicate_mask(batch, predicates)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError, TypeError):
+            return None
+
+    if all(isinstance(predicate, tuple) for predicate in predicates):
+        # ANDed, each of the masks we can work out narrows the rows down
+        masks = [predicate_mask(batch, predicate) for predicate in predicates]
+        masks = [mask for mask in masks if mask is not None]
+        if not masks:
+            return None
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = pc.and_(mask, other)
+        return mask
+
+    if all(isinstance(predicate, list) for predicate in predicates):
+        # ORed, if we don't know about any of them we can't remove any rows
+        mask = None
+        for predicate in predicates:
+            other = predicate_mask(batch, predicate)
+            if other is None:
+                return None
+            mask = other if mask is None else pc.or_(mask, other)
+        return mask
+
+    return None
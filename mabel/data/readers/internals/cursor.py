@@ -1,16 +1,29 @@
 """
 Separate the implementation of the Cursor from the Reader.
 
-Cursor is made of three parts:
+Cursor is made of a map of the blobs which have been read, and the position in the
+blob being read:
 - map      : a bit array representing all of the blobs in the set - unread blobs
              are 0s and read blobs are 1s. This allows for blobs to be read in
              an arbitrary order - although currently only implemented linearly.
 - partition: the active parition (blob) that is being read
 - location : the record in the active partition (blob), so we can resume reading
              midway through the blob if required.
+- row      : the row in the decompressed partition (blob) the record at location
+             came from, so we can skip straight to it rather than reading and
+             filtering all of the records before it again.
+- offset   : for line formats, the byte offset of the end of that row in the
+             decompressed partition (blob), so we can start reading from there
+             rather than splitting the lines before it. -1 if it isn't known.
+
+When blobs are read concurrently, more than one blob can be partially read, these
+are recorded in an additional part:
+- in_flight: the partially read blobs, as a map of the partition (blob) to the
+             location, row and offset of the last record read from it.
 """
 
 import orjson
+from bitarray import bitarray
 from xxhash import xxh3_64_intdigest
 
 
@@ -22,16 +35,22 @@ class Cursor:
     def __init__(self, readable_blobs, cursor=None):
         # sort the readable blobs so they are in a consistent order
         self.readable_blobs = sorted(readable_blobs)
-        self.read_blobs = []
+        # the position of each blob in the map, so we don't need to search for them
+        self._positions = {blob: i for i, blob in enumerate(self.readable_blobs)}
+        self._read_map = bitarray(len(self.readable_blobs))
+        self._read_map.setall(0)
+        # all of the blobs before this position have been read
+        self._first_unread = 0
         self.partition = ""
         self.location = -1
+        self.row = -1
+        self.offset = -1
+        self.in_flight: dict = {}
 
         if cursor:
             self.load_cursor(cursor)
 
     def load_cursor(self, cursor):
-        from bitarray import bitarray
-
         if cursor is None:
             return
 
@@ -46,41 +65,131 @@ class Cursor:
             raise InvalidCursor(f"Cursor is malformed or corrupted {cursor}")
 
         self.location = cursor["location"]
-        find_partition = [
-            blob
-            for blob in self.readable_blobs
-            if xxh3_64_intdigest(blob, 0) == cursor["partition"]
-        ]
-        if len(find_partition) == 1:
-            self.partition = find_partition[0]
+        # cursors created before rows were recorded need to replay the records
+        self.row = cursor.get("row", -1)
+        self.offset = cursor.get("offset", -1)
+        blob_hashes = {xxh3_64_intdigest(blob, 0): blob for blob in self.readable_blobs}
+        self.partition = blob_hashes.get(cursor["partition"], "")
         map_bytes = bytes.fromhex(cursor["map"])
         blob_map = bitarray()
         blob_map.frombytes(map_bytes)
-        self.read_blobs = [
-            self.readable_blobs[i] for i in range(len(self.readable_blobs)) if blob_map[i]
-        ]
+        # the map is padded to whole bytes, and blobs added since the cursor was
+        # created are unread
+        blob_map = blob_map[: len(self.readable_blobs)]
+        self._read_map[: len(blob_map)] = blob_map
+        for partition, location in cursor.get("in_flight", {}).items():
+            blob = blob_hashes.get(int(partition))
+            if blob is None:
+                raise InvalidCursor(f"Cursor refers to an unknown partition {partition}")
+            # cursors created before rows were recorded only have the location
+            if isinstance(location, int):
+                location = (location, -1, -1)
+            self.in_flight[blob] = tuple(location)
 
     def next_blob(self, previous_blob=None):
         if previous_blob:
-            self.read_blobs.append(previous_blob)
-            self.partition = ""
-            self.location = -1
+            self.complete_blob(previous_blob)
+        if not (self.partition and self.location >= 0) and self.in_flight:
+            # resume blobs which were partially read concurrently one at a time
+            self.partition = next(iter(self.in_flight))
+            self.location, self.row, self.offset = self.in_flight.pop(self.partition)
         if self.partition and self.location >= 0:
-            if self.partition in self.readable_blobs:
-                return self.partition
-            partition_finder = [
-                blob for blob in self.readable_blobs if xxh3_64_intdigest(blob, 0) == self.partition
-            ]
-            if len(partition_finder) != 1:
+            if self.partition not in self._positions:
                 raise ValueError(f"Unable to determine current partition ({self.partition})")
-            return partition_finder[0]
-        unread = [blob for blob in self.readable_blobs if blob not in self.read_blobs]
-        if len(unread) > 0:
-            self.partition = unread[0]
+            return self.partition
+        for blob in self._unread_blobs():
+            self.partition = blob
             self.location = -1
+            self.row = -1
+            self.offset = -1
             return self.partition
         return None
 
+    def start_row(self):
+        """
+        The row to start reading the current partition from, None if we don't know
+        and need to use `skip_to_cursor`.
+        """
+        if self.location < 0:
+            return 0
+        if self.row < 0:
+            return None
+        return self.row + 1
+
+    def start_byte(self):
+        """
+        The offset in the current partition to start reading from, 0 if we don't
+        know it and need to skip rows instead.
+        """
+        if self.location < 0 or self.row < 0:
+            return 0
+        return max(self.offset, 0)
+
+    def _unread_blobs(self):
+        """
+        Unread blobs, in order, excluding the current partition and blobs in flight.
+        """
+        position = self._read_map.find(0, self._first_unread)
+        self._first_unread = position if position >= 0 else len(self._read_map)
+        while position >= 0:
+            blob = self.readable_blobs[position]
+            if blob != self.partition and blob not in self.in_flight:
+                yield blob
+            position = self._read_map.find(0, position + 1)
+
+    def peek_blobs(self, count):
+        """
+        The blobs which will be read after the current one, in the order they will
+        be read.
+        """
+        upcoming = list(self.in_flight)[:count]
+        for blob in self._unread_blobs():
+            if len(upcoming) >= count:
+                break
+            upcoming.append(blob)
+        return upcoming
+
+    @property
+    def read_blobs(self):
+        return [self.readable_blobs[i] for i in self._read_map.search(1)]
+
+    def unread_count(self):
+        return len(self._read_map) - self._read_map.count(1)
+
+    def blobs_to_read(self):
+        """
+        The blobs still to be read when reading concurrently, as tuples of the blob,
+        the number of records already read from it, and the row and byte offset to
+        start reading it from. The row is None if it isn't known and the records
+        already read need to be skipped. Partially read blobs are first.
+        """
+        if self.partition in self._positions and self.location >= 0:
+            self.in_flight.setdefault(self.partition, (self.location, self.row, self.offset))
+        self.partition = ""
+        self.location = -1
+        started = [
+            (blob, location + 1, row + 1 if row >= 0 else None, max(offset, 0) if row >= 0 else 0)
+            for blob, (location, row, offset) in self.in_flight.items()
+        ]
+        return started + [(blob, 0, 0, 0) for blob in self._unread_blobs()]
+
+    def record_read(self, blob, row=-1, offset=-1):
+        """
+        Record a record has been read from a blob being read concurrently, and the
+        row and offset in the blob it came from.
+        """
+        location = self.in_flight.get(blob, (-1,))[0]
+        self.in_flight[blob] = (location + 1, row, offset)
+
+    def complete_blob(self, blob):
+        self.in_flight.pop(blob, None)
+        self._read_map[self._positions[blob]] = 1
+        if blob == self.partition:
+            self.partition = ""
+            self.location = -1
+            self.row = -1
+            self.offset = -1
+
     def skip_to_cursor(self, iterator):
         # cycle through the iterator to the cursor location
         if self.location < 0:
@@ -90,24 +199,34 @@ class Cursor:
         return self.location + 1
 
     def get(self):
-        return {
+        cursor = {
             "map": self["map"],
             "partition": self["partition"],
             "location": self["location"],
+            "row": self["row"],
+            "offset": self["offset"],
         }
+        if self.in_flight:
+            cursor["in_flight"] = self["in_flight"]
+        return cursor
 
     def __getitem__(self, item):
-        from bitarray import bitarray
-
         if item == "map":
-            blob_map = bitarray(
-                "".join(["1" if blob in self.read_blobs else "0" for blob in self.readable_blobs])
-            )
-            return blob_map.tobytes().hex()
+            return self._read_map.tobytes().hex()
         if item == "partition":
             return xxh3_64_intdigest(self.partition, 0)
         if item == "location":
             return self.location
+        if item == "row":
+            return self.row
+        if item == "offset":
+            return self.offset
+        if item == "in_flight":
+            # JSON keys must be strings
+            return {
+                str(xxh3_64_intdigest(blob, 0)): list(position)
+                for blob, position in self.in_flight.items()
+            }
         return None
 
     def __repr__(self):
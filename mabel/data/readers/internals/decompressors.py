@@ -1,17 +1,87 @@
+import collections
+import io
+import itertools
+import mmap
+
 from ....errors import MissingDependencyError
 
+# the number of rows to decode from columnar files at a time, this bounds the
+# memory used to read a blob regardless of how big the blob is
+BATCH_SIZE: int = 8192
+# the number of bytes to decompress at a time from compressed line files
+CHUNK_SIZE: int = 4 * 1024 * 1024  # 4Mb
+# the number of bytes to read from the end of a parquet file to get its footer,
+# most footers fit so the footer is usually read in one request
+PARQUET_FOOTER_READ: int = 64 * 1024  # 64Kb
+PARQUET_MAGIC = b"PAR1"
+
 
-def zstd(stream):
+def split_lines(file, chunk_size: int = CHUNK_SIZE, position: int = 0, offsets=None):
+    """
+    Read a file-like object in chunks and yield the lines in it as they are
+    completed, only one chunk (and a partial line) is held in memory at a time.
+
+    If `offsets` is given, the byte offset of the end of each line, counting from
+    `position`, is appended to it before the line is yielded.
+    """
+    carry_forward = b""
+    chunk = file.read(chunk_size)
+    while chunk:
+        lines = (carry_forward + chunk).split(b"\n")
+        carry_forward = lines.pop()
+        for line in lines:
+            if offsets is not None:
+                position += len(line) + 1
+                offsets.append(position)
+            yield line
+        chunk = file.read(chunk_size)
+    if carry_forward:
+        if offsets is not None:
+            offsets.append(position + len(carry_forward))
+        yield carry_forward
+
+
+def _skip_lines(lines, start_row, offsets=None):
+    """
+    Skip the first `start_row` lines, the offsets of the lines skipped are removed.
+    """
+    lines = iter(lines)
+    if start_row > 0:
+        collections.deque(itertools.islice(lines, start_row), maxlen=0)
+        if offsets is not None:
+            offsets.clear()
+    yield from lines
+
+
+def zstd(stream, chunk_size=None, start_row=0, start_byte=0, offsets=None, **kwargs):
     """
     Read zstandard compressed files
+
+    The file is decompressed in chunks, so lines are yielded before the whole file
+    has been decompressed and memory use is proportional to the chunk size.
+
+    Parameters:
+        start_row: integer (optional)
+            The number of lines to skip
+        start_byte: integer (optional)
+            The offset in the decompressed file to start from, the file is written
+            as a single frame so the data before it is decompressed, but it isn't
+            split into lines
+        offsets: deque (optional)
+            The offset of the end of each line yielded is appended to it
     """
     import zstandard  # type:ignore
 
-    with zstandard.open(stream, "rb") as file:  # type:ignore
-        yield from file.read().split(b"\n")[:-1]
+    decompressor = zstandard.ZstdDecompressor()
+    with decompressor.stream_reader(stream, read_across_frames=True) as file:
+        if start_byte > 0:
+            file.seek(start_byte)
+        yield from _skip_lines(
+            split_lines(file, chunk_size or CHUNK_SIZE, start_byte, offsets), start_row, offsets
+        )
 
 
-def lzma(stream):
+def lzma(stream, start_row=0, **kwargs):
     """
     Read LZMA compressed files
     """
@@ -19,10 +89,10 @@ def lzma(stream):
     import lzma
 
     with lzma.open(stream, "rb") as file:  # type:ignore
-        yield from file
+        yield from itertools.islice(file, start_row, None)
 
 
-def unzip(stream):
+def unzip(stream, start_row=0, **kwargs):
     """
     Read ZIP compressed files
     """
@@ -32,21 +102,176 @@ def unzip(stream):
 
     from .parallel_reader import KNOWN_EXTENSIONS
 
-    with zipfile.ZipFile(stream, "r") as zip:
-        for file_name in zipfile.ZipFile.namelist(zip):
-            file = zip.read(file_name)
-            # get the extention of the file(s) in the ZIP and put them
-            # through a secondary decompressor and parser
-            ext = "." + file_name.split(".")[-1]
-            if ext in KNOWN_EXTENSIONS:
-                decompressor, parser, file_type = KNOWN_EXTENSIONS[ext]
-                for line in decompressor(io.BytesIO(file)):
-                    yield parser(line)
+    if isinstance(stream, mmap.mmap):
+        # zipfile needs more of the file interface than memory maps have, the
+        # members are read into memory anyway so copying the archive is cheap
+        stream = io.BytesIO(stream)
+
+    def _read_zip():
+        with zipfile.ZipFile(stream, "r") as zip:
+            for file_name in zipfile.ZipFile.namelist(zip):
+                file = zip.read(file_name)
+                # get the extention of the file(s) in the ZIP and put them
+                # through a secondary decompressor and parser
+                ext = "." + file_name.split(".")[-1]
+                if ext in KNOWN_EXTENSIONS:
+                    decompressor, parser, file_type = KNOWN_EXTENSIONS[ext]
+                    for line in decompressor(io.BytesIO(file)):
+                        yield parser(line)
+
+    yield from itertools.islice(_read_zip(), start_row, None)
+
+
+def _statistics_may_match(minimum, maximum, op, value):
+    """
+    Determine if a value could satisfy a predicate given the min and max values in
+    a row group, if we can't tell we say it might match.
+    """
+
+    def comparable(a, b):
+        if isinstance(a, bool) or isinstance(b, bool):
+            return False
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            return True
+        return type(a) == type(b)
+
+    try:
+        if op == "in":
+            return any(not comparable(minimum, v) or minimum <= v <= maximum for v in value)
+        if not comparable(minimum, value):
+            return True
+        if op in ("=", "==", "is"):
+            return minimum <= value <= maximum
+        if op == "<":
+            return minimum < value
+        if op == "<=":
+            return minimum <= value
+        if op == ">":
+            return maximum > value
+        if op == ">=":
+            return maximum >= value
+    except TypeError:  # pragma: no cover
+        pass
+    return True
+
+
+def _row_group_may_match(row_group, column_positions, predicates):
+    """
+    Use the row group statistics to work out if any of the rows in the group could
+    satisfy a set of predicates in DNF.
+    """
+    if not predicates:
+        return True
+
+    # lists of lists are ORs, the row group is needed if any of the ANDs could match
+    if all(isinstance(p, list) for p in predicates):
+        return any(_row_group_may_match(row_group, column_positions, p) for p in predicates)
+
+    for predicate in predicates:
+        if not isinstance(predicate, tuple) or len(predicate) != 3:
+            continue
+        column, op, value = predicate
+        if column not in column_positions or not isinstance(op, str):
+            continue
+        statistics = row_group.column(column_positions[column]).statistics
+        if statistics is None:
+            continue
+        # filters never match nulls, so if the column is all nulls nothing matches
+        if statistics.null_count == row_group.num_rows:
+            return False
+        if not statistics.has_min_max:
+            continue
+        if not _statistics_may_match(statistics.min, statistics.max, op.lower(), value):
+            return False
+    return True
+
+
+def parquet_row_groups(metadata, filters=None, start_row=0):
+    """
+    The row groups to read from a parquet file, and the row to start from in the
+    first of them.
+    """
+    # the statistics are on the leaf columns, we can only use top-level columns
+    column_positions = {}
+    for position in range(metadata.num_columns):
+        path = metadata.schema.column(position).path
+        if "." not in path:
+            column_positions[path] = position
+
+    row_groups = [
+        index
+        for index in range(metadata.num_row_groups)
+        if _row_group_may_match(metadata.row_group(index), column_positions, filters)
+    ]
+    # skip the row groups before the row we're starting from
+    while row_groups and metadata.row_group(row_groups[0]).num_rows <= start_row:
+        start_row -= metadata.row_group(row_groups.pop(0)).num_rows
+    return row_groups, start_row
 
 
-def parquet(stream):
+def parquet_metadata(read_tail):
+    """
+    Read the metadata of a parquet file from its footer, without reading the rest
+    of the file.
+
+    Parameters:
+        read_tail: callable
+            Given a number of bytes, returns up to that many bytes from the end of
+            the file
+
+    Returns:
+        The file's metadata, or None if the file isn't parquet
+    """
+    try:
+        import pyarrow.parquet as pq  # type:ignore
+    except ImportError:  # pragma: no cover
+        raise MissingDependencyError(
+            "`pyarrow` is missing, please install or include in requirements.txt"
+        )
+
+    tail = read_tail(PARQUET_FOOTER_READ)
+    if len(tail) < 12 or tail[-4:] != PARQUET_MAGIC:
+        return None
+    # the file ends with the footer, the footer length and the magic bytes
+    footer_length = int.from_bytes(tail[-8:-4], "little") + 8
+    if footer_length > len(tail):
+        tail = read_tail(footer_length)
+    # pyarrow only checks the magic bytes at the start of the file, not the data
+    # between them and the footer
+    return pq.read_metadata(io.BytesIO(PARQUET_MAGIC + tail[-footer_length:]))
+
+
+def parquet(stream, **kwargs):
     """
     Read parquet formatted files
+
+    The file is read in batches, so only one batch of rows is converted to Python
+    objects at a time. The parameters are the same as `parquet_batches`.
+    """
+    for batch in parquet_batches(stream, **kwargs):
+        yield from batch.to_pylist()
+
+
+def parquet_batches(
+    stream, columns=None, filters=None, batch_size=None, start_row=0, metadata=None, **kwargs
+):
+    """
+    Read parquet formatted files as Arrow record batches
+
+    Parameters:
+        columns: list (optional)
+            The columns to read, the default is to read all of the columns
+        filters: list (optional)
+            Predicates in DNF, row groups whose statistics show they can't match
+            are not read. The rows which are read are not filtered.
+        batch_size: integer (optional)
+            The number of rows to decode at a time, the default is BATCH_SIZE
+        start_row: integer (optional)
+            The number of rows to skip, whole row groups are skipped without being
+            read. Rows are counted after row groups have been filtered out.
+        metadata: FileMetaData (optional)
+            The file's metadata if it has already been read, see `parquet_metadata`,
+            so the footer isn't parsed again
     """
     try:
         import pyarrow.parquet as pq  # type:ignore
@@ -55,23 +280,96 @@ def parquet(stream):
             "`pyarrow` is missing, please install or include in requirements.txt"
         )
 
-    table = pq.read_table(stream)
-    yield from table.to_pylist()
+    parquet_file = pq.ParquetFile(stream, metadata=metadata)
+    metadata = parquet_file.metadata
+
+    # only read the columns that are in the file, if none of the columns we want
+    # are in the file we read them all so we still get the right number of rows
+    if columns is not None:
+        available_columns = set(parquet_file.schema_arrow.names)
+        columns = [column for column in columns if column in available_columns] or None
+
+    row_groups, start_row = parquet_row_groups(metadata, filters, start_row)
+    if len(row_groups) == 0:
+        return
+
+    for batch in parquet_file.iter_batches(
+        batch_size=batch_size or BATCH_SIZE,
+        row_groups=row_groups,
+        columns=columns,
+        use_threads=False,
+    ):
+        if start_row >= batch.num_rows:
+            start_row -= batch.num_rows
+            continue
+        if start_row > 0:
+            batch = batch.slice(start_row)
+            start_row = 0
+        yield batch
+
+
+def _buffer(stream):
+    """
+    The contents of a stream, without copying them if we can avoid it.
+    """
+    if isinstance(stream, (bytes, mmap.mmap)):
+        return stream
+    if isinstance(stream, io.BytesIO):
+        # a BytesIO shares the bytes it was created from, this isn't a copy
+        return stream.getvalue()
+    return stream.read()
+
+
+def split_buffer(buffer, start: int = 0, offsets=None):
+    """
+    Split a buffer into lines, the lines are memoryviews of the buffer so they
+    aren't copied. Lines end with a newline, the carriage return of a Windows
+    line ending is removed.
+
+    If `offsets` is given, the offset of the end of each line (including the
+    newline) is appended to it before the line is yielded.
+    """
+    view = memoryview(buffer)
+    size = len(buffer)
+    while start < size:
+        end = buffer.find(b"\n", start)
+        if end == -1:
+            end = size
+        line_end = end
+        if line_end > start and buffer[line_end - 1] == 13:  # \r
+            line_end -= 1
+        if offsets is not None:
+            offsets.append(min(end + 1, size))
+        yield view[start:line_end]
+        start = end + 1
 
 
-def lines(stream):
+def lines(stream, start_row=0, start_byte=0, offsets=None, **kwargs):
     """
     Default reader, assumes text format
+
+    The lines are memoryviews of the blob, if the blob is memory mapped lines are
+    yielded as soon as they are read from the file.
+
+    Parameters:
+        start_row: integer (optional)
+            The number of lines to skip
+        start_byte: integer (optional)
+            The offset in the blob to start from, the blob before it isn't split
+        offsets: deque (optional)
+            The offset of the end of each line yielded is appended to it
     """
-    text = stream.read()  # type:ignore
-    yield from text.splitlines()
+    buffer = _buffer(stream)
+    yield from _skip_lines(split_buffer(buffer, start_byte, offsets), start_row, offsets)
 
 
-def block(stream):
-    yield stream.read()
+def block(stream, start_row=0, **kwargs):
+    if start_row == 0:
+        yield stream.read()
 
 
-def csv(stream):
+def csv(stream, start_row=0, **kwargs):
     import csv
 
-    yield from csv.DictReader(stream.read().decode("utf8").splitlines())
+    reader = csv.DictReader(stream.read().decode("utf8").splitlines())
+    yield from itertools.islice(reader, start_row, None)
@@ -20,6 +20,7 @@ Evaluator("LEFT(NAME, 1), AGE").evaluate(dic)
 will perform the function LEFT on the NAME field from the dict and return AGE
 from the dict
 """
+
 import re
 
 from mabel.data.readers.internals.inline_functions import FUNCTIONS
@@ -81,6 +82,28 @@ def get_fields(tokens):
     return list(inner(tokens))
 
 
+def get_variables(tokens):
+    """
+    Get the names of the fields read from the record to evaluate a set of tokens,
+    returns None if all of the fields are read (there's a `*`).
+    """
+    variables = set()
+    for token in tokens:
+        if token["type"] == TOKENS.EVERYTHING:
+            return None
+        if token["type"] == TOKENS.VARIABLE:
+            variable = token["value"]
+            if variable[0] == variable[-1] == "`":
+                variable = variable[1:-1]
+            variables.add(variable)
+        elif token["type"] in (TOKENS.FUNCTION, TOKENS.AGGREGATOR):
+            inner_variables = get_variables(token["parameters"])
+            if inner_variables is None:
+                return None
+            variables.update(inner_variables)
+    return variables
+
+
 def build(tokens):
     response = []
     if not isinstance(tokens, TokenSet):
@@ -227,24 +250,178 @@ class TokenSet(list):
         return self._index == self._max
 
 
+def _over_record(record, fields: dict) -> dict:
+    """
+    The fields of a select which includes `*` over a copy of the record.
+    """
+    if hasattr(record, "as_dict"):
+        values = record.as_dict()
+    else:
+        values = record.copy()
+    values.update(fields)
+    return values
+
+
+def _constant_value(token):
+    """
+    The value of a token which is the same for every record
+    """
+    token_type = token["type"]
+    if token_type == TOKENS.EVERYTHING:
+        return "*"
+    if token_type == TOKENS.FLOAT:
+        return float(token["value"])
+    if token_type == TOKENS.INTEGER:
+        return int(token["value"])
+    if token_type == TOKENS.LITERAL:
+        return str(token["value"])[1:-1]
+    if token_type == TOKENS.DATE:
+        return parse_iso(token["value"][1:-1])
+    if token_type == TOKENS.BOOLEAN:
+        return str(token["value"]).upper() == "TRUE"
+    return None
+
+
+def compile_field(token):
+    """
+    Compile a token into its label and either a function which evaluates it for a
+    record, or None and its value if it's the same for every record. This gives
+    the same results as `evaluate_field`, but the tokens are only interpreted once.
+    """
+    token_type = token["type"]
+    if token_type == TOKENS.VARIABLE:
+        variable = token["value"]
+        if variable[0] == variable[-1] == "`":
+            variable = variable[1:-1]
+        return token["value"], (lambda record: record.get(variable)), None
+    if token_type == TOKENS.FUNCTION:
+        label = token["as"] or get_fields([token]).pop()
+        function = FUNCTIONS[str(token["value"]).upper()]
+        parameters = [compile_field(parameter)[1:] for parameter in token["parameters"]]
+        if all(getter is None for getter, value in parameters):
+            arguments = [value for getter, value in parameters]
+            return label, (lambda record: function(*arguments)), None
+        getters = [getter or (lambda record, value=value: value) for getter, value in parameters]
+        if len(getters) == 1:
+            getter = getters[0]
+            return label, (lambda record: function(getter(record))), None
+        return label, (lambda record: function(*[getter(record) for getter in getters])), None
+    return token["value"], None, _constant_value(token)
+
+
+def _compile_fields(tokens):
+    """
+    The values of the fields which are the same for every record, in the order
+    they're selected, and the functions which evaluate the rest. If a label is
+    selected more than once the last one sets the value.
+    """
+    template = {}
+    getters = {}
+    for token in tokens:
+        label, getter, value = compile_field(token)
+        template[label] = value
+        getters.pop(label, None)
+        if getter is not None:
+            getters[label] = getter
+    everything = any(token["type"] == TOKENS.EVERYTHING for token in tokens)
+    return template, getters, everything
+
+
+def compile_projection(tokens):
+    """
+    Compile a select into a function which creates the result for a record.
+
+    The values which are the same for every record are worked out once. If the
+    select includes `*`, the result is a copy of the record with the selected
+    fields added to it.
+    """
+    template, getters, everything = _compile_fields(tokens)
+    getters = tuple(getters.items())
+
+    def project(record):
+        fields = template.copy()
+        for label, getter in getters:
+            fields[label] = getter(record)
+        return fields
+
+    if everything:
+        return lambda record: _over_record(record, project(record))
+    return project
+
+
+def compile_filtered_projection(tokens, filters):
+    """
+    Compile a select and a filter of its results into a function which selects
+    from the records which pass the filter.
+
+    The filter sees the same values it would if it filtered the results of the
+    select, but only the fields it reads are evaluated before it's applied, the
+    rest of the select is only evaluated for the records which pass.
+    """
+    template, getters, everything = _compile_fields(tokens)
+    projection = compile_projection(tokens)
+    variables = filters.variables()
+
+    # where the values of the fields the filter reads come from
+    evaluated = tuple((label, getters[label]) for label in getters if label in variables)
+    constants = {label: template[label] for label in variables if label in template}
+    for label, getter in evaluated:
+        constants.pop(label)
+    record_fields = ()
+    if everything:
+        record_fields = tuple(label for label in variables if label not in template)
+
+    if not evaluated and not constants and everything:
+        # the filter only reads fields of the record
+        return lambda records: map(projection, filter(filters, records))
+
+    remaining = tuple(
+        (label, getter) for label, getter in getters.items() if label not in variables
+    )
+
+    def select_filtered(records):
+        for record in records:
+            values = constants.copy()
+            for label, getter in evaluated:
+                values[label] = getter(record)
+            for label in record_fields:
+                if label in record:
+                    values[label] = record[label]
+            if not filters(values):
+                continue
+            fields = template.copy()
+            for label, getter in evaluated:
+                fields[label] = values[label]
+            for label, getter in remaining:
+                fields[label] = getter(record)
+            if everything:
+                yield _over_record(record, fields)
+            else:
+                yield fields
+
+    return select_filtered
+
+
 class Evaluator:
     def __init__(self, proforma):
         reg = re.compile(r"(\(|\)|,|\bAS\b)", re.IGNORECASE)
         tokens = [t.strip() for t in reg.split(proforma) if t.strip() not in ("", ",")]
         self.tokens = build(tokens)
         self._iter = None
+        self._projection = compile_projection(self.tokens)
+
+    def __getstate__(self):
+        # the compiled projection is a closure, which can't be pickled
+        state = self.__dict__.copy()
+        state.pop("_projection", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._projection = compile_projection(self.tokens)
 
     def __call__(self, dic):
-        builder = {}
-        if any(t["type"] == TOKENS.EVERYTHING for t in self.tokens):
-            if hasattr(dic, "as_dict"):
-                builder = dic.as_dict()
-            else:
-                builder = dic.copy()
-        for field in self.tokens:
-            (k, v) = evaluate_field(dic, field)
-            builder[k] = v
-        return builder
+        return self._projection(dic)
 
     def __iter__(self):
         return self
@@ -254,5 +431,31 @@ class Evaluator:
             self._iter = iter(self.tokens)
         return next(self._iter)
 
+    def filtered(self, filters):
+        """
+        Create a function which selects from an iterable of records, returning the
+        results which pass the filters, see `compile_filtered_projection`.
+
+        Parameters:
+            filters: Expression or DnfFilters
+                The filters to apply to the results of the select
+        """
+        return compile_filtered_projection(self.tokens, filters)
+
+    def passes_through(self, fields) -> bool:
+        """
+        If the results have all of the fields, with the values of the fields of the
+        record with the same names, i.e. they aren't computed, dropped or renamed.
+        """
+        labels = {}
+        for token in self.tokens:
+            label = compile_field(token)[0]
+            labels[label] = token["type"] == TOKENS.VARIABLE and label[0] != "`"
+        everything = any(token["type"] == TOKENS.EVERYTHING for token in self.tokens)
+        return all(labels.get(field, everything) for field in fields)
+
     def fields(self):
         return get_fields(self.tokens)
+
+    def variables(self):
+        return get_variables(self.tokens)
@@ -0,0 +1,62 @@
+"""
+Cache of the blobs listed at a path, so readers of the same dataset in the same
+process don't need to list the storage again.
+
+Listings of partitions for past dates change rarely, so they are kept for longer
+than listings of today's partition, which are likely to still be written to.
+Entries can be removed before they expire with `invalidate`.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable
+from typing import Optional
+
+CURRENT_PARTITION_TTL: int = 60  # seconds
+PAST_PARTITION_TTL: int = 60 * 60  # 1 hour
+MAXIMUM_ENTRIES: int = 1024
+
+
+class ListingCache:
+    def __init__(self, maximum_entries: int = MAXIMUM_ENTRIES):
+        self.maximum_entries = maximum_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, reader_key, path: str) -> Optional[list]:
+        """
+        Get the blobs listed at a path, None if they're not cached or have expired.
+        """
+        with self._lock:
+            entry = self._entries.get((reader_key, path))
+            if entry is None:
+                return None
+            expires, blobs = entry
+            if expires < time.monotonic():
+                self._entries.pop((reader_key, path))
+                return None
+            self._entries.move_to_end((reader_key, path))
+            return list(blobs)
+
+    def set(self, reader_key, path: str, blobs: Iterable[str], ttl: float):
+        with self._lock:
+            self._entries[(reader_key, path)] = (time.monotonic() + ttl, tuple(blobs))
+            self._entries.move_to_end((reader_key, path))
+            while len(self._entries) > self.maximum_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path: Optional[str] = None):
+        """
+        Remove the listings of a path, and the paths under it, from the cache. If
+        no path is given, the cache is cleared.
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[1].startswith(str(path))]:
+                self._entries.pop(key)
+
+
+LISTING_CACHE = ListingCache()
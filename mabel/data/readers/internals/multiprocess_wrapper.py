@@ -4,15 +4,29 @@ to be manually enabled.
 
 When a reliable use case for multiprocessing is identified it may be included into the
 automatic running of the data accesses.
+
+Workers hand pages of records back to the parent pickled and compressed, which is
+faster than converting them to JSON and back, and nested values keep their types.
+Pages which can't be pickled are sent as compressed JSON.
+
+Every message is tagged with the blob the records came from, and the row and byte
+offset in the blob of each record, so the parent can keep a cursor of how far
+through each blob it has read. Resumed reads tell the workers the row and offset to
+start blobs which were partially read from, so the records before them aren't read
+again.
 """
 
 import datetime
+import itertools
 import logging
 import multiprocessing
 import os
+import pickle  # nosec
 import time
+from array import array
 from multiprocessing import Queue
 from queue import Empty
+from types import SimpleNamespace
 
 import lz4.frame
 
@@ -20,6 +34,8 @@ from .parsers import json
 
 TERMINATE_SIGNAL = -1
 MAXIMUM_SECONDS_PROCESSES_CAN_RUN = 600
+RECORDS_PER_PAGE = 10000
+END_OF_RECORDS = "END OF RECORDS"
 
 
 def fix_dict(obj: dict) -> dict:
@@ -40,7 +56,7 @@ def fix_dict(obj: dict) -> dict:
         return str(dt)
 
     if not isinstance(obj, dict):
-        return obj  # type:ignore
+        return obj  # type: ignore
 
     for key in obj.keys():
         obj[key] = fix_fields(obj[key])
@@ -53,23 +69,79 @@ def serialize(ob):
     return orjson.dumps(fix_dict(ob))
 
 
-def _inner_process(func, source_queue, reply_queue):  # pragma: no cover
+def _paginate(records, page_size):
+    page = []
+    for record in records:
+        # lazy records can't be sent to another process, they're sent as dicts
+        if hasattr(record, "as_dict"):
+            record = record.as_dict()
+        page.append(record)
+        if len(page) == page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def _track_positions(records, counter, positions):
+    """
+    Append the row and offset of each record to `positions` as it is read.
+    """
+    for record in records:
+        positions.extend((counter.row, counter.offset))
+        yield record
+
+
+def _write_pickled_page(page):
+    """
+    Pickle a page of records, returns None if the records can't be pickled.
+    """
+    try:
+        return ("pickle", lz4.frame.compress(pickle.dumps(page)))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return None
+
+
+def _read_page(message):
+    if message[0] == "pickle":
+        return pickle.loads(lz4.frame.decompress(message[1]))  # nosec - from our workers
+    records = lz4.frame.decompress(message[1]).split(b"\n")
+    return [json(r) for r in records if r]
+
+
+def _inner_process(func, source_queue, reply_queue, support_files):  # pragma: no cover
     try:
         source = source_queue.get(timeout=1)
     except Empty:  # pragma: no cover
         source = TERMINATE_SIGNAL
 
     while source != TERMINATE_SIGNAL:
+        # sources are the blob name, the number of records already read from it, and
+        # the row and offset to start from, the row is None if we don't know it
+        blob, records_to_skip, start_row, start_byte = source
         # non blocking wait - this isn't thread aware in that it can trivially
         # have race conditions, but it will apply a simple back-off so we're
         # not exhausting memory when we know we should wait
         while reply_queue.full():
             time.sleep(1)
-        # the empty list here is where the list of indicies should go
-        reply_queue.put(
-            lz4.frame.compress(b"\n".join(map(serialize, func(source, [])))),
-            timeout=30,
-        )
+        index_files = [f for f in support_files if blob in f and f.endswith(".idx")]
+        counter = SimpleNamespace(row=-1, offset=-1)
+        if start_row is None:
+            records = itertools.islice(
+                func(blob, index_files, row_counter=counter), records_to_skip, None
+            )
+        else:
+            records = func(
+                blob, index_files, start_row=start_row, start_byte=start_byte, row_counter=counter
+            )
+        positions = array("q")
+        for page in _paginate(_track_positions(records, counter, positions), RECORDS_PER_PAGE):
+            message = _write_pickled_page(page)
+            if message is None:
+                message = ("json", lz4.frame.compress(b"\n".join(map(serialize, page))))
+            reply_queue.put((blob, message, positions[:]), timeout=30)
+            del positions[:]
+        reply_queue.put((blob, END_OF_RECORDS, None), timeout=30)
         source = None
         while source is None:
             try:
@@ -78,11 +150,29 @@ def _inner_process(func, source_queue, reply_queue):  # pragma: no cover
                 source = None
 
 
-def processed_reader(func, items_to_read, support_files):  # pragma: no cover
+def processed_reader(func, items_to_read, support_files, cursor=None):  # pragma: no cover
+    """
+    Read blobs in separate processes.
+
+    Parameters:
+        func: callable
+            Called with the blob name and index files, returns the records
+        items_to_read: list
+            The blobs to read, either as names or as tuples of the name, the
+            number of records already read from the blob, and the row and byte
+            offset to start from, see `Cursor.blobs_to_read`
+        support_files: list
+            Files, such as indexes, which are passed to the reading function
+        cursor: Cursor (optional)
+            Updated with the records and blobs read, so the read can be resumed
+    """
+    items_to_read = [i if isinstance(i, tuple) else (i, 0, 0, 0) for i in items_to_read]
+
     if os.name == "nt":  # pragma: no cover
         raise NotImplementedError("Reader Multi Processing not available on Windows platforms")
 
     process_pool = []
+    parent_pid = os.getpid()
 
     # determine the number of slots we're going to make available:
     # - less than or equal to the number of files to read
@@ -100,7 +190,7 @@ def processed_reader(func, items_to_read, support_files):  # pragma: no cover
     for i in range(slots):
         process = multiprocessing.Process(
             target=_inner_process,
-            args=(func, send_queue, reply_queue),
+            args=(func, send_queue, reply_queue, support_files),
         )
         process.daemon = True
         process.start()
@@ -115,8 +205,18 @@ def processed_reader(func, items_to_read, support_files):  # pragma: no cover
         or not send_queue.empty()
     ):
         try:
-            records = reply_queue.get(timeout=1)
-            yield from map(json, [r for r in lz4.frame.decompress(records).split(b"\n") if r])
+            blob, message, positions = reply_queue.get(timeout=1)
+            if message != END_OF_RECORDS:
+                records = _read_page(message)
+                for record, row, offset in zip(records, positions[0::2], positions[1::2]):
+                    # record the read before we yield, so a cursor taken while
+                    # the record is being processed doesn't return it again
+                    if cursor is not None:
+                        cursor.record_read(blob, row, offset)
+                    yield record
+                continue
+            if cursor is not None:
+                cursor.complete_blob(blob)
             if item_index < len(items_to_read):
                 send_queue.put_nowait(items_to_read[item_index])
                 item_index += 1
@@ -133,6 +233,19 @@ def processed_reader(func, items_to_read, support_files):  # pragma: no cover
             logging.error("GENERATOR EXIT DETECTED")
             break
 
+    # the generator can be cleaned up by a forked copy of this process, only the
+    # process which started the workers can stop them
+    if os.getpid() != parent_pid:
+        return
+
+    # if we stopped reading early the workers will still be running, they may be
+    # part way through writing to the queues so we can't wait for them to finish
+    if any({p.is_alive() for p in process_pool}):
+        for process in process_pool:
+            process.terminate()
+        reply_queue.cancel_join_thread()
+        send_queue.cancel_join_thread()
+
     reply_queue.close()
     send_queue.close()
     reply_queue.join_thread()
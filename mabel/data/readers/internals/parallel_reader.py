@@ -9,34 +9,52 @@ dataset:
 │ Function   │ Role                                                       │
 ├────────────┼────────────────────────────────────────────────────────────┤
 │ Pre-Filter │ Pre-filter the rows based on a subset of the filters       │
+│            │ using indexes, or the statistics in parquet footers        │
 │            │                                                            │
 │ Read       │ Read the raw content from the file                         │
 │            │                                                            │
 │ Decompress │ Convert the raw content to lined data                      │
 │            │                                                            │
+│ Index      │ Remove the rows the indexes tell us can't match            │
+│            │                                                            │
 │ Parse      │ Interpret the lined data into dictionaries                 │
 │            │                                                            │
-│ Filter     │ Apply full set of row filters to the read data             │
+│ Mask       │ Remove the rows the filters rule out from Arrow batches,   │
+│            │ before they're converted to dictionaries                   │
+│            │                                                            │
+│ Filter     │ Apply full set of row filters to the read data, evaluating │
+│            │ only the parts of the select the filters read              │
+│            │                                                            │
+│ Transform  │ Evaluate the rest of the select for the rows which pass    │
 │            │                                                            │
 │ Reduce     │ Aggregate                                                  │
 └────────────┴────────────────────────────────────────────────────────────┘
 """
+
+import collections
+import itertools
 from enum import Enum
 
 from orso import logging
 
 from mabel.data.internals.dnf_filters import DnfFilters
 from mabel.data.internals.expression import Expression
+from mabel.data.internals.index import Index
+from mabel.data.internals.index import search_indexes
 from mabel.data.internals.records import flatten
+from mabel.data.readers.internals.inline_evaluator import Evaluator
 from mabel.utils import paths
+from mabel.utils.token_labeler import TOKENS
+from mabel.utils.token_labeler import interpret_value
 
+from . import columnar
 from . import decompressors
 from . import parsers
 
 logger = logging.get_logger()
 
 
-def empty_list(x):
+def empty_list(x, **kwargs):
     return []
 
 
@@ -65,6 +83,9 @@ KNOWN_EXTENSIONS = {
 }
 
 
+# the decompressors which can record the byte offset of each line, and start from one
+SEEKABLE_DECOMPRESSORS = (decompressors.lines, decompressors.zstd)
+
 pass_thru = lambda x: x
 
 
@@ -72,6 +93,132 @@ def no_filter(x):
     return True
 
 
+def select_rows(record_iterator, rows, start_row=0):
+    """
+    Only yield the rows at the positions in `rows`, we stop reading once we're past
+    the last row we're interested in.
+    """
+    if not rows:
+        return
+    last_row = max(rows)
+    for position, record in enumerate(record_iterator, start=start_row):
+        if position in rows:
+            yield record
+        if position >= last_row:
+            return
+
+
+def count_rows(record_iterator, counter, start_row=0, offsets=None):
+    """
+    Keep `counter.row` as the position of the last row read from the decompressor,
+    the pipeline is lazy so when a record is yielded this is the row it came from.
+
+    If the decompressor records the byte offsets of the rows in `offsets`,
+    `counter.offset` is kept as the offset of the end of the row.
+    """
+    for counter.row, record in enumerate(record_iterator, start=start_row):
+        if offsets:
+            counter.offset = offsets.popleft()
+        yield record
+
+
+def json_batches(record_iterator, schema, columns=None, batch_size=None):
+    """
+    Parse JSON lines a batch at a time into Arrow record batches. Lines which can't
+    be parsed into Arrow, for example because they don't match the schema or Arrow
+    would change their values, are parsed one at a time and yielded as a list of
+    records.
+
+    If `columns` is set, only those columns are kept in the batches.
+    """
+    import pyarrow  # type:ignore
+
+    while True:
+        lines = list(itertools.islice(record_iterator, batch_size or decompressors.BATCH_SIZE))
+        if not lines:
+            return
+        try:
+            batch = parsers.json_batch(lines, schema, columns)
+            # Arrow skips blank lines, we need a record for each line
+            if batch is not None and batch.num_rows == len(lines):
+                yield batch
+                continue
+        except pyarrow.ArrowInvalid:
+            pass
+        yield [parsers.json(line) for line in lines]
+
+
+def batch_records(batches, predicates=None, counter=None, start_row=0, offsets=None):
+    """
+    Convert Arrow record batches to records. The rows the predicates rule out are
+    removed from each batch with the Arrow compute kernels first, so they're never
+    converted. Lists of records are passed through.
+
+    Rows are counted before they're removed, so `counter.row` is the position of
+    the record in the blob, as it is when rows are read one at a time, and
+    `counter.offset` the offset of the end of the row if `offsets` are recorded.
+    """
+    import pyarrow.compute as pc  # type:ignore
+
+    position = start_row
+    # the row the first of the offsets is for
+    offset_row = start_row
+    for batch in batches:
+        if isinstance(batch, list):
+            size, records = len(batch), batch
+            positions = range(position, position + size)
+        else:
+            size = batch.num_rows
+            mask = columnar.predicate_mask(batch, predicates)
+            if mask is None:
+                records = batch.to_pylist()
+                positions = range(position, position + size)
+            else:
+                records = batch.filter(mask).to_pylist()
+                positions = [position + index for index in pc.indices_nonzero(mask).to_pylist()]
+        for row, record in zip(positions, records):
+            if counter is not None:
+                counter.row = row
+                if offsets:
+                    # the offsets of the rows which were removed aren't needed
+                    while offset_row < row and len(offsets) > 1:
+                        offsets.popleft()
+                        offset_row += 1
+                    counter.offset = offsets.popleft()
+                    offset_row += 1
+            yield record
+        position += size
+
+
+# the operators in Expressions we can pass to the decompressors
+PUSHDOWN_OPERATORS = {"=": "==", "==": "==", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+
+def expression_predicates(treeNode):
+    """
+    Extract the simple comparisons which are ANDed together at the top of an
+    Expression, as DNF tuples. This isn't a complete conversion, it's just the
+    predicates the decompressors can use to avoid reading data.
+    """
+    if treeNode.token_type == TOKENS.AND:
+        return expression_predicates(treeNode.left) + expression_predicates(treeNode.right)
+    if (
+        treeNode.token_type != TOKENS.OPERATOR
+        or treeNode.left.token_type != TOKENS.VARIABLE
+        or treeNode.right.token_type not in (TOKENS.INTEGER, TOKENS.FLOAT, TOKENS.LITERAL)
+    ):
+        return []
+    column = treeNode.left.value
+    if column[0] == column[-1] == "`":
+        column = column[1:-1]
+    value = treeNode.right.value
+    if treeNode.value == "IN" and isinstance(value, list):
+        return [(column, "in", [interpret_value(v) for v in value if str(v).strip() != ","])]
+    if treeNode.value in PUSHDOWN_OPERATORS and not isinstance(value, list):
+        return [(column, PUSHDOWN_OPERATORS[treeNode.value], value)]
+    return []
+
+
 def expand_nested_json(row):
     # this is really slow - on a simple read it's roughly 60% of the execution
     if hasattr(row, "items"):
@@ -94,6 +241,9 @@ class ParallelReader:
         columns="*",
         reducer=pass_thru,
         override_format=None,
+        batch_size=None,
+        schema=None,
+        lazy_records=False,
         **kwargs,
     ):
         """
@@ -103,13 +253,32 @@ class ParallelReader:
             columns: callable
             filters: callable
             reducer: callable
+            override_format: string
+            batch_size: integer
+            schema: RelationSchema
+                If set, JSON lines are parsed in batches into Arrow using the
+                types in the schema
+            lazy_records: boolean
+                If set, JSON lines are parsed into records which only decode the
+                fields which are accessed
             **kwargs: kwargs
         """
 
+        # the filters are applied to the results of the select, if they read a field
+        # the select computes, e.g. `YEAR(dob)`, or doesn't include, the values in
+        # the data can't be used to rule rows out before the select
+        self.push_down_filters = not (
+            isinstance(columns, Evaluator)
+            and isinstance(filters, (Expression, DnfFilters))
+            and not columns.passes_through(filters.variables())
+        )
+
         # DNF form is a representation of logical expressions which it is easier
         # to apply any indicies to - we can convert Expressions to DNF but we can't
         # convert functions to DNF.
-        if isinstance(filters, DnfFilters):
+        if not self.push_down_filters:
+            self.dnf_filter = None
+        elif isinstance(filters, DnfFilters):
             self.dnf_filter = filters
         elif isinstance(filters, Expression):
             self.dnf_filter = DnfFilters(filters.to_dnf())
@@ -132,12 +301,109 @@ class ParallelReader:
         # sometimes the user knows better
         self.override_format = override_format
 
+        # the decompressors which understand them can use these to avoid reading
+        # columns and rows we don't need, and to limit how much they decode at once
+        self.decompressor_hints = {
+            "columns": self._columns_to_read(),
+            "filters": self._predicates_to_push_down(),
+            "batch_size": batch_size,
+        }
+
+        # parsing JSON a line at a time is dominated by the per-line overhead, with a
+        # schema we can parse a batch of lines at a time without guessing types
+        self.arrow_schema = None
+        if schema:
+            self.arrow_schema = parsers.arrow_schema(schema)
+
+        self.json_parser = parsers.lazy_json if lazy_records else parsers.json
+
         if self.override_format:
             self.override_format = self.override_format.lower()
             if not self.override_format[0] == ".":
                 self.override_format = "." + self.override_format
 
-    def __call__(self, blob_name, index_files):
+    def _columns_to_read(self):
+        """
+        The columns needed by the select and the filters, None means all of them.
+        """
+        if not isinstance(self.columns, Evaluator):
+            return None
+        columns = self.columns.variables()
+        if columns is None:
+            return None
+        if isinstance(self.filters, (Expression, DnfFilters)):
+            columns.update(self.filters.variables())
+        elif self.filters not in (no_filter, pass_thru):
+            # we don't know what a filter function reads
+            return None
+        return sorted(columns)
+
+    def _predicates_to_push_down(self):
+        if not self.push_down_filters:
+            return None
+        if isinstance(self.filters, Expression):
+            return expression_predicates(self.filters.root) or None
+        if self.dnf_filter is not None:
+            return self.dnf_filter.predicates or None
+        return None
+
+    def _read_indexes(self, blob_name, index_files):
+        """
+        Index files are named after the blob and the column they index, e.g.
+        `blob.jsonl.user_id.idx` is the index of `user_id` for `blob.jsonl`.
+        """
+        indexes = {}
+        for index_file in index_files:
+            if not index_file.startswith(blob_name + ".") or not index_file.endswith(".idx"):
+                continue
+            column = index_file[len(blob_name) + 1 : -4]
+            indexes[column] = Index(self.reader.get_blob_bytes(index_file))
+        return indexes
+
+    def _rows_to_read(self, blob_name, index_files):
+        """
+        Use the indexes to work out which rows may match the filters, None means
+        we don't know and need to read all of the rows.
+        """
+        if not index_files or self.dnf_filter is None:
+            return None
+        indexes = self._read_indexes(blob_name, index_files)
+        # Expressions are searched directly, their DNF form quotes literals
+        if isinstance(self.filters, Expression):
+            return search_indexes(indexes, self.filters)
+        return search_indexes(indexes, self.dnf_filter)
+
+    def _parquet_metadata(self, blob_name):
+        """
+        Read the metadata from the footer of a parquet blob, only the footer is
+        downloaded. The metadata is passed on to the decompressor if the blob is
+        read, so the footer is only parsed once.
+        """
+        return decompressors.parquet_metadata(
+            lambda size: self.reader.get_blob_range(blob_name, -size)
+        )
+
+    def __call__(self, blob_name, index_files, start_row=0, start_byte=0, row_counter=None):
+        """
+        Read a blob.
+
+        Parameters:
+            blob_name: string
+                The blob to read
+            index_files: list
+                The index files for the blob
+            start_row: integer (optional)
+                The number of rows to skip in the decompressed blob, rows skipped
+                are not parsed or filtered
+            start_byte: integer (optional)
+                The offset in the decompressed blob of `start_row`, line formats
+                start from here rather than splitting the lines before it
+            row_counter: object (optional)
+                The `row` attribute is updated with the position of the row in the
+                decompressed blob of each record as it is yielded, and the `offset`
+                attribute with the offset of the end of the row, or -1 if the
+                format doesn't record offsets
+        """
         # print(blob_name, "in")
         try:
             if self.override_format:
@@ -149,18 +415,90 @@ class ParallelReader:
                 return []
             decompressor, parser, file_type = KNOWN_EXTENSIONS[ext]
 
+            # Pre-Filter - if the indexes tell us no rows match, don't read the blob
+            rows = self._rows_to_read(blob_name, index_files)
+            if rows is not None and len(rows) == 0:
+                return []
+
+            hints = {**self.decompressor_hints, "start_row": start_row}
+            offsets = None
+            if decompressor in SEEKABLE_DECOMPRESSORS:
+                if start_byte > 0:
+                    hints.update({"start_row": 0, "start_byte": start_byte})
+                if row_counter is not None:
+                    offsets = collections.deque()
+                    hints["offsets"] = offsets
+            if row_counter is not None:
+                row_counter.offset = -1
+
+            if rows is not None:
+                # index positions are rows in the blob, so we can't skip row groups
+                hints["filters"] = None
+            elif decompressor is decompressors.parquet and hints["filters"]:
+                # if the statistics rule out all of the row groups, don't read the blob
+                metadata = self._parquet_metadata(blob_name)
+                if metadata is not None:
+                    row_groups, _ = decompressors.parquet_row_groups(
+                        metadata, hints["filters"], start_row
+                    )
+                    if len(row_groups) == 0:
+                        return []
+                    hints["metadata"] = metadata
+
             # Read
             record_iterator = self.reader.read_blob(blob_name)
-            # Decompress
-            record_iterator = decompressor(record_iterator)
-            # Parse
-            record_iterator = map(parser, record_iterator)
+            batches = None
+            if decompressor is decompressors.parquet and rows is None:
+                # Decompress - into Arrow record batches
+                batches = decompressors.parquet_batches(record_iterator, **hints)
+            else:
+                # Decompress
+                record_iterator = decompressor(record_iterator, **hints)
+                if (
+                    self.arrow_schema is not None
+                    and parser is parsers.json
+                    and decompressor is not decompressors.block
+                    and rows is None
+                ):
+                    # Parse - a batch at a time into Arrow record batches
+                    batches = json_batches(
+                        record_iterator,
+                        self.arrow_schema,
+                        columns=hints["columns"],
+                        batch_size=hints["batch_size"],
+                    )
+            if batches is not None:
+                # Mask - remove the rows the filters rule out a column at a time, only
+                # the rows left are converted to records, this counts the rows
+                predicates = hints["filters"]
+                if isinstance(self.filters, Expression) and self.push_down_filters:
+                    predicates = self.filters
+                record_iterator = batch_records(
+                    batches, predicates, counter=row_counter, start_row=start_row, offsets=offsets
+                )
+            else:
+                if row_counter is not None:
+                    record_iterator = count_rows(record_iterator, row_counter, start_row, offsets)
+                # Index
+                if rows is not None:
+                    record_iterator = select_rows(record_iterator, rows, start_row)
+                # Parse
+                if parser is parsers.json:
+                    parser = self.json_parser
+                record_iterator = map(parser, record_iterator)
             # Expand Nested JSON
             # record_iterator = map(expand_nested_json, record_iterator)
-            # Transform
-            record_iterator = map(self.columns, record_iterator)
-            # Filter
-            record_iterator = filter(self.filters, record_iterator)
+            if isinstance(self.columns, Evaluator) and isinstance(
+                self.filters, (Expression, DnfFilters)
+            ):
+                # Filter and Transform - only the fields the filters read are
+                # evaluated before filtering, the rest only for the rows which pass
+                record_iterator = self.columns.filtered(self.filters)(record_iterator)
+            else:
+                # Transform
+                record_iterator = map(self.columns, record_iterator)
+                # Filter
+                record_iterator = filter(self.filters, record_iterator)
             # Reduce
             record_iterator = self.reducer(record_iterator)
             # Yield
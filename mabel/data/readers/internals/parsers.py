@@ -1,10 +1,223 @@
+import io
+
 import orjson
 
+from ....errors import MissingDependencyError
+from mabel.utils.arrow import is_string
+
+try:
+    import simdjson  # type:ignore
+
+    simdjson_installed = True
+except ImportError:  # pragma: no cover
+    simdjson_installed = False
+
 pass_thru = lambda x: x
 
 json = orjson.loads
 
 
+def _decode(value):
+    # nested objects and arrays are decoded when they're accessed, so they don't
+    # hold on to the parsed document
+    if hasattr(value, "as_dict"):
+        return value.as_dict()
+    if hasattr(value, "as_list"):
+        return value.as_list()
+    return value
+
+
+class LazyRecord:
+    """
+    A JSON record which only decodes the fields which are accessed, it's only
+    decoded into a dictionary when all of it is needed or it's changed.
+    """
+
+    __slots__ = ("_document", "_values")
+
+    def __init__(self, document):
+        self._document = document
+        self._values = None
+
+    def _decoded(self) -> dict:
+        if self._values is None:
+            self._values = self._document.as_dict()
+            self._document = None
+        return self._values
+
+    def __getitem__(self, key):
+        if self._values is not None:
+            return self._values[key]
+        return _decode(self._document[key])
+
+    def get(self, key, default=None):
+        if self._values is not None:
+            return self._values.get(key, default)
+        if key in self._document:
+            return _decode(self._document[key])
+        return default
+
+    def __contains__(self, key):
+        if self._values is not None:
+            return key in self._values
+        return key in self._document
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        if self._values is not None:
+            return len(self._values)
+        return len(self._document)
+
+    def keys(self):
+        if self._values is not None:
+            return self._values.keys()
+        return self._document.keys()
+
+    def values(self):
+        return self._decoded().values()
+
+    def items(self):
+        return self._decoded().items()
+
+    def __setitem__(self, key, value):
+        self._decoded()[key] = value
+
+    def __delitem__(self, key):
+        del self._decoded()[key]
+
+    def pop(self, key, *default):
+        return self._decoded().pop(key, *default)
+
+    def setdefault(self, key, default=None):
+        return self._decoded().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._decoded().update(*args, **kwargs)
+
+    def copy(self) -> dict:
+        return self.as_dict()
+
+    def as_dict(self) -> dict:
+        if self._values is None:
+            return self._document.as_dict()
+        return dict(self._values)
+
+    @property
+    def mini(self) -> bytes:
+        if self._values is None:
+            return self._document.mini
+        return orjson.dumps(self._values)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyRecord):
+            other = other._decoded()
+        return self._decoded() == other
+
+    def __repr__(self):
+        return f"LazyRecord({self._decoded()!r})"
+
+    def __reduce__(self):
+        # parsed documents can't be pickled, so we're pickled as a dictionary
+        return (dict, (self._decoded(),))
+
+
+def lazy_json(line):
+    """
+    Parse a JSON line into a LazyRecord, each record has its own parser so records
+    can be kept after the next line has been parsed.
+    """
+    if not simdjson_installed:  # pragma: no cover
+        raise MissingDependencyError(
+            "`pysimdjson` is missing, please install or include in requirements.txt"
+        )
+    document = simdjson.Parser().parse(line)
+    if hasattr(document, "keys"):
+        return LazyRecord(document)
+    return _decode(document)
+
+
+def arrow_schema(schema):
+    """
+    Convert the types in a schema the data was written with to an Arrow schema for
+    `json_batch`. Only types Arrow parses to the same values as `json` are used,
+    timestamps and dates are read as strings so they aren't converted.
+    """
+    import pyarrow  # type:ignore
+
+    types = {
+        "VARCHAR": pyarrow.string(),
+        "TIMESTAMP": pyarrow.string(),
+        "DATE": pyarrow.string(),
+        "INTEGER": pyarrow.int64(),
+        "DOUBLE": pyarrow.float64(),
+        "BOOLEAN": pyarrow.bool_(),
+    }
+    return pyarrow.schema(
+        [
+            pyarrow.field(column.name, types[column.type])
+            for column in schema.columns
+            if column.type in types
+        ]
+    )
+
+
+def _unchanged(values) -> bool:
+    """
+    If values Arrow inferred the type of are the same as `json` parses them to.
+    Integers in a column with floats become floats, objects get the keys of all of
+    the objects in the column and missing values become None, so only columns of
+    integers, booleans and strings, or lists of them, without nulls are.
+    """
+    import pyarrow  # type:ignore
+
+    if len(values) == 0:
+        return True
+    if values.null_count:
+        return False
+    if pyarrow.types.is_list(values.type):
+        return _unchanged(values.flatten())
+    return (
+        pyarrow.types.is_integer(values.type)
+        or pyarrow.types.is_boolean(values.type)
+        or is_string(values.type)
+    )
+
+
+def json_batch(lines, schema=None, columns=None):
+    """
+    Parse a list of JSON lines into an Arrow RecordBatch. If `columns` is set,
+    only those columns are kept, if none of them are in the lines all of the
+    columns are kept so the batch still has a row for each line.
+
+    Columns which aren't in the schema have their types inferred, which can change
+    their values, None is returned if any of them that are kept may have changed.
+    """
+    import pyarrow.json  # type:ignore
+
+    names = set(schema.names) if schema is not None else set()
+    # if we only need columns in the schema, the rest aren't parsed
+    known = columns is not None and names.issuperset(columns)
+    buffer = b"\n".join(lines)
+    table = pyarrow.json.read_json(
+        io.BytesIO(buffer),
+        read_options=pyarrow.json.ReadOptions(use_threads=False, block_size=len(buffer) + 1),
+        parse_options=pyarrow.json.ParseOptions(
+            explicit_schema=schema,
+            unexpected_field_behavior="ignore" if known else "infer",
+        ),
+    )
+    batch = table.combine_chunks().to_batches()[0]
+    if columns is not None:
+        available = [column for column in columns if column in batch.schema.names]
+        batch = batch.select(available) if available else batch
+    for name in batch.schema.names:
+        if name not in names and not _unchanged(batch.column(name)):
+            return None
+    return batch
+
+
 def pass_thru_block(ds):
     """each blob is read as a block"""
     if isinstance(ds, str):
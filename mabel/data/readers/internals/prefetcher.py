@@ -0,0 +1,76 @@
+"""
+Fetch the blobs we're going to read next in the background, so the time spent
+waiting for the storage platform overlaps with the time spent processing the
+blob we're currently reading.
+
+The blobs are still handed over in the order they are asked for, the prefetcher
+only changes when they are downloaded, not the order they are read in.
+
+Blobs are fetched with the reader's `async_read_blob` from an event loop on a single
+thread, the downloads themselves run on the reader's thread pool, so up to the
+reader's `max_concurrency` downloads can be in flight at once.
+"""
+
+import asyncio
+import threading
+from typing import List
+
+
+class BlobPrefetcher:
+    def __init__(self, reader, depth: int = 1):
+        """
+        Wrap an inner reader so blobs can be fetched ahead of being read.
+
+        Parameters:
+            reader: BaseInnerReader
+                The reader used to fetch the blobs
+            depth: integer
+                The maximum number of blobs to fetch ahead of the one being read
+        """
+        self.reader = reader
+        self.depth = max(depth, 1)
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._run_loop, name="mabel-prefetch", daemon=True).start()
+        self._futures: dict = {}
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+        # the loop has been stopped, let anything still running be cancelled
+        pending = asyncio.all_tasks(self._loop)
+        for task in pending:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self._loop.close()
+
+    def _submit(self, blob: str):
+        return asyncio.run_coroutine_threadsafe(self.reader.async_read_blob(blob), self._loop)
+
+    def prefetch(self, blobs: List[str]):
+        """
+        Start fetching the blob about to be read and the `depth` blobs after it, in
+        the order they will be read. Fetches for blobs which are no longer coming up
+        are abandoned.
+        """
+        upcoming = blobs[: self.depth + 1]
+        for blob in [b for b in self._futures if b not in upcoming]:
+            self._futures.pop(blob).cancel()
+        for blob in upcoming:
+            if blob not in self._futures:
+                self._futures[blob] = self._submit(blob)
+
+    def read_blob(self, blob: str):
+        future = self._futures.pop(blob, None)
+        if future is None:
+            return self.reader.read_blob(blob)
+        return future.result()
+
+    def close(self):
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def __getattr__(self, attribute):
+        # anything we don't handle is passed to the reader we're wrapping
+        return getattr(self.reader, attribute)
@@ -1,4 +1,6 @@
+import copy
 import datetime
+import itertools
 from typing import Dict
 from typing import Optional
 from typing import Union
@@ -10,16 +12,21 @@ from mabel.data.internals.dictset import DictSet
 from mabel.data.internals.dnf_filters import DnfFilters
 from mabel.data.internals.expression import Expression
 from mabel.data.readers.internals.cursor import Cursor
+from mabel.data.readers.internals.decompressors import BATCH_SIZE
 from mabel.data.readers.internals.inline_evaluator import Evaluator
 from mabel.data.readers.internals.multiprocess_wrapper import processed_reader
 from mabel.data.readers.internals.parallel_reader import EXTENSION_TYPE
 from mabel.data.readers.internals.parallel_reader import KNOWN_EXTENSIONS
 from mabel.data.readers.internals.parallel_reader import ParallelReader
 from mabel.data.readers.internals.parallel_reader import pass_thru
+from mabel.data.readers.internals.prefetcher import BlobPrefetcher
+from mabel.data.validator import schema_loader
 from mabel.errors import DataNotFoundError
 from mabel.errors import InvalidCombinationError
 from mabel.utils.dates import parse_delta
 from mabel.utils.parameter_validator import validate
+from mabel.utils.token_labeler import TOKENS
+from mabel.utils.token_labeler import get_token_type
 
 # fmt:off
 RULES = [
@@ -34,14 +41,25 @@ RULES = [
     {"name": "filters", "required": False, "warning": "", "incompatible_with": []},
     {"name": "persistence", "required": False, "warning": "", "incompatible_with": []},
     {"name": "override_format", "required": False, "warning": "", "incompatible_with": []},
-    {"name": "multiprocess", "required": False, "warning": "", "incompatible_with": ["cursor"]},
+    {"name": "multiprocess", "required": False, "warning": "", "incompatible_with": []},
     {"name": "valid_dataset_prefixes", "required": False},
     {"name": "partitions", "required": False, "warning": None, "incompatible_with": ["raw_path"]},
     {"name": "partition_filter", "required":False, "warning":"`partition_filter` is not expected to be a permanent addition to the API", "incompatible_with": ["freshness_limit"] },
-    {"name": "project", "required":False, "warning":"`project` is no longer required for most Readers", "incompatible_with": []}
+    {"name": "project", "required":False, "warning":"`project` is no longer required for most Readers", "incompatible_with": []},
+    {"name": "batch_size", "required": False, "warning": None, "incompatible_with": []},
+    {"name": "prefetch", "required": False, "warning": None, "incompatible_with": []},
+    {"name": "cache_listings", "required": False, "warning": None, "incompatible_with": []},
+    {"name": "blob_cache_directory", "required": False, "warning": None, "incompatible_with": []},
+    {"name": "blob_cache_size", "required": False, "warning": None, "incompatible_with": []},
+    {"name": "max_concurrency", "required": False, "warning": None, "incompatible_with": []},
+    {"name": "schema", "required": False, "warning": None, "incompatible_with": []},
+    {"name": "lazy_records", "required": False, "warning": None, "incompatible_with": []},
 ]
 # fmt:on
 
+# the fewest rows decoded at a time when a limited number of records are read
+MINIMUM_LIMITED_BATCH_SIZE: int = 1024
+
 
 class AccessDenied(Exception):
     pass
@@ -62,6 +80,10 @@ def Reader(
     valid_dataset_prefixes: Optional[list] = None,
     partitions=["year_{yyyy}/month_{mm}/day_{dd}"],
     partition_filter=None,
+    batch_size: Optional[int] = None,
+    prefetch: int = 0,
+    schema=None,
+    lazy_records: bool = False,
     **kwargs,
 ) -> DictSet:
     """
@@ -126,7 +148,9 @@ def Reader(
         multiprocess: boolean (optional)
             Split the task over multiple CPUs to improve throughput. Note that there
             are conditions that must be met for the multiprocessor to be safe which
-            may mean even though this is set, data is accessed serially.
+            may mean even though this is set, data is accessed serially. Records
+            from different blobs are interleaved, but the cursor can still be used
+            to resume the read.
         valid_dataset_prefixes: list (optional)
             Raises an error if the start of the dataset isn't on the list. The
             intended use is for situations where an external agent can initiate
@@ -138,9 +162,48 @@ def Reader(
         partition_filter: tuple (optional)
             Provide a hint on how to filter the partitions, as a single tuple in DNF
             notiation, this may be ignored.
+        batch_size: integer (optional)
+            The number of rows to decode at a time from columnar formats, such as
+            parquet. Smaller batches use less memory, larger batches are faster.
+        prefetch: integer (optional)
+            The number of blobs to download in the background while the current
+            blob is being read, the default is 0 (no prefetching). Each prefetched
+            blob is held in memory until it is read. The downloads run on the
+            inner reader's thread pool, so at most `max_concurrency` of them are
+            in flight at once.
+        cache_listings: boolean (optional)
+            Reuse the list of blobs in the dataset from an earlier reader in this
+            process, the default is False. Listings for past dates are reused for
+            up to an hour, listings for today for up to a minute, use
+            `LISTING_CACHE.invalidate` to remove them sooner.
+        blob_cache_directory: string (optional)
+            A local directory to cache blobs from complete `as_at_` frames in, these
+            blobs can't change so are read from the cache by later readers, including
+            readers in other processes. The default is not to cache blobs.
+        blob_cache_size: integer (optional)
+            The size in bytes the blob cache can grow to, the default is 1Gb.
+        max_concurrency: integer (optional)
+            The most requests to make to the storage at once when prefetching blobs
+            or listing a range of dates, the default is 32.
+        schema: RelationSchema or list (optional)
+            The schema the data was written with, in any form the writers accept.
+            JSON lines are parsed in batches into Arrow using the column types in
+            the schema, rather than one line at a time. Records have all of the
+            columns in the schema, missing values are None. Lines with fields
+            Arrow would change the values of, e.g. objects or a mix of integers
+            and floats outside of the schema, are still parsed one at a time.
+        lazy_records: boolean (optional)
+            Parse JSON into records which only decode the fields which are read,
+            rather than decoding every field of every record, the default is False.
+            Records behave like dictionaries, use `as_dict` to get a dictionary.
+            Requires `pysimdjson`, and doesn't apply if the lines are parsed in
+            batches because a `schema` is given.
 
     Returns:
         DictSet
+            If it isn't persisted, `select`, `filter` and `take` on the DictSet
+            before it's read are applied by the Reader as it reads the data, as
+            if they'd been passed as parameters.
 
     """
     # We can provide an optional whitelist of prefixes that we allow access to
@@ -194,11 +257,40 @@ def Reader(
             override_format=override_format,
             cursor=cursor,
             multiprocess=multiprocess,
+            batch_size=batch_size,
+            prefetch=prefetch,
+            schema=schema,
+            lazy_records=lazy_records,
         ),
         storage_class=persistence,
     )
 
 
+def _conjunction(filters):
+    """
+    The predicates of DNF filters which are all ANDed together, otherwise None.
+    """
+    if not isinstance(filters, DnfFilters):
+        return None
+    predicates = filters.predicates
+    if isinstance(predicates, tuple):
+        return [predicates]
+    if all(isinstance(predicate, tuple) for predicate in predicates):
+        return list(predicates)
+    return None
+
+
+def _plain_field(field):
+    # fields which a select reads from the record as they're named
+    return (
+        isinstance(field, str)
+        and field == field.strip()
+        and get_token_type(field) == TOKENS.VARIABLE
+        and field[0] != "`"
+        and Evaluator(field).fields() == [field]
+    )
+
+
 class _LowLevelReader(object):
     def __init__(
         self,
@@ -209,6 +301,10 @@ class _LowLevelReader(object):
         override_format,
         cursor,
         multiprocess,
+        batch_size=None,
+        prefetch=0,
+        schema=None,
+        lazy_records=False,
     ):
         self.reader_class = reader_class
         self.freshness_limit = freshness_limit
@@ -217,6 +313,11 @@ class _LowLevelReader(object):
         self.cursor = cursor
         self._inner_line_reader = None
         self.multiprocess = multiprocess
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.schema = schema_loader(schema) if schema else None
+        self.lazy_records = lazy_records
+        self.limit = None
 
         if isinstance(filters, str):
             self.filters = Expression(filters)
@@ -230,6 +331,76 @@ class _LowLevelReader(object):
         else:
             self.select = pass_thru
 
+    def push_down(self, select=None, filters=None, limit=None):
+        """
+        Create a copy of this reader which also applies a select, a filter or a
+        limit to what it reads, so they're applied while the data is read rather
+        than to the records after they're read. This is how DictSet operations on
+        a Reader are pushed down to it.
+
+        The operations are applied after the ones the reader already has, as if
+        they were applied to the records the reader returns. If the reader has
+        started reading, or the result wouldn't be the same, None is returned.
+
+        Parameters:
+            select: list of strings (optional)
+                The fields to select, as `DictSet.select`
+            filters: string, tuple or list (optional)
+                An Expression or DNF filters, as `DictSet.filter`
+            limit: integer (optional)
+                The maximum number of records to read, as `DictSet.take`
+
+        Returns:
+            _LowLevelReader or None
+        """
+        if self._inner_line_reader is not None:
+            return None
+
+        reader = copy.copy(self)
+
+        if filters is not None:
+            # a filter after a limit isn't the same as a limit after a filter
+            if self.limit is not None:
+                return None
+            if isinstance(filters, str):
+                filters = Expression(filters)
+            elif isinstance(filters, (tuple, list)):
+                filters = DnfFilters(filters)
+            else:
+                return None
+            # the filters are applied to the selected fields, so the select must
+            # pass the fields they read through unchanged
+            if self.select is not pass_thru and not self.select.passes_through(filters.variables()):
+                return None
+            if self.filters is None:
+                reader.filters = filters
+            else:
+                # only sets of ANDed DNF predicates are combined
+                existing = _conjunction(self.filters)
+                additional = _conjunction(filters)
+                if existing is None or additional is None:
+                    return None
+                reader.filters = DnfFilters(existing + additional)
+
+        if select is not None:
+            if self.select is not pass_thru:
+                return None
+            if isinstance(select, str):
+                select = [select]
+            # only fields which the select in the reader reads as they're named
+            if not select or not all(_plain_field(field) for field in select):
+                return None
+            # the filters are applied to the selected fields, so the select must
+            # include the fields they read
+            if self.filters is not None and not self.filters.variables() <= set(select):
+                return None
+            reader.select = Evaluator(", ".join(select))
+
+        if limit is not None:
+            reader.limit = limit if self.limit is None else min(limit, self.limit)
+
+        return reader
+
     def _create_line_reader(self):
         # get list of blobs handles as_at, by and frames
         blob_list = self.reader_class.get_list_of_blobs()
@@ -266,45 +437,74 @@ class _LowLevelReader(object):
         else:
             get_logger().debug(message)
 
+        # if only a few records are read, don't decode more rows at a time than needed
+        batch_size = self.batch_size
+        if self.limit is not None and batch_size is None:
+            batch_size = min(max(self.limit, MINIMUM_LIMITED_BATCH_SIZE), BATCH_SIZE)
+
         parallel = ParallelReader(
             reader=self.reader_class,
             columns=self.select,
             filters=self.filters or pass_thru,
             override_format=self.override_format,
+            batch_size=batch_size,
+            schema=self.schema,
+            lazy_records=self.lazy_records,
         )
 
+        if not isinstance(self.cursor, Cursor):
+            self.cursor = Cursor(readable_blobs=readable_blobs, cursor=self.cursor)
         use_multiprocess = all(
             [
                 self.multiprocess,  # the user must have asked for it
-                not self.cursor,  # we must not have a cursor
-                len(readable_blobs) > 4,  # we must enough files to read
+                self.cursor.unread_count() > 4,  # we must enough files to read
+                self.limit is None,  # the processes would read more than the limit
             ]
         )
 
         if not use_multiprocess:
             get_logger().debug(f"Serial Reader {self.cursor}")
-            if not isinstance(self.cursor, Cursor):
-                cursor = Cursor(readable_blobs=readable_blobs, cursor=self.cursor)
-                self.cursor = cursor
-
-            blob_to_read = self.cursor.next_blob()
-            while blob_to_read:
-                blob_reader = parallel(
-                    blob_to_read,
-                    [
-                        idx
-                        for idx in supported_blobs
-                        if blob_to_read in idx and idx.endswith(".idx")
-                    ],
-                )
-                location = self.cursor.skip_to_cursor(blob_reader)
-                for self.cursor.location, record in enumerate(blob_reader, start=location):
-                    yield record
-                blob_to_read = self.cursor.next_blob(blob_to_read)
+
+            # fetch the next blobs in the background while we're reading this one
+            prefetcher = None
+            if self.prefetch > 0:
+                prefetcher = BlobPrefetcher(self.reader_class, self.prefetch)
+                parallel.reader = prefetcher
+
+            try:
+                blob_to_read = self.cursor.next_blob()
+                while blob_to_read:
+                    if prefetcher:
+                        upcoming = self.cursor.peek_blobs(self.prefetch)
+                        prefetcher.prefetch([blob_to_read] + upcoming)
+                    start_row = self.cursor.start_row()
+                    blob_reader = parallel(
+                        blob_to_read,
+                        [
+                            idx
+                            for idx in supported_blobs
+                            if blob_to_read in idx and idx.endswith(".idx")
+                        ],
+                        start_row=start_row or 0,
+                        start_byte=self.cursor.start_byte(),
+                        row_counter=self.cursor,
+                    )
+                    if start_row is None:
+                        location = self.cursor.skip_to_cursor(blob_reader)
+                    else:
+                        location = self.cursor.location + 1
+                    for self.cursor.location, record in enumerate(blob_reader, start=location):
+                        yield record
+                    blob_to_read = self.cursor.next_blob(blob_to_read)
+            finally:
+                if prefetcher:
+                    prefetcher.close()
 
         else:
             get_logger().debug("Parallel Reader")
-            yield from processed_reader(parallel, readable_blobs, supported_blobs)
+            yield from processed_reader(
+                parallel, self.cursor.blobs_to_read(), supported_blobs, self.cursor
+            )
 
     def __iter__(self):
         return self
@@ -312,6 +512,8 @@ class _LowLevelReader(object):
     def __next__(self):
         if self._inner_line_reader is None:
             self._inner_line_reader = self._create_line_reader()
+            if self.limit is not None:
+                self._inner_line_reader = itertools.islice(self._inner_line_reader, self.limit)
 
         # get the the next line from the reader
         return self._inner_line_reader.__next__()
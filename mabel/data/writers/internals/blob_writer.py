@@ -1,6 +1,7 @@
 import io
 import json
 import threading
+from typing import List
 from typing import Optional
 
 import orjson
@@ -9,6 +10,7 @@ import zstandard
 from orso.logging import get_logger
 from orso.schema import RelationSchema
 
+from mabel.data.internals.index import IndexBuilder
 from mabel.data.internals.records import flatten
 from mabel.data.validator import schema_loader
 from mabel.errors import MissingDependencyError
@@ -24,6 +26,7 @@ class BlobWriter(object):
     buffer = bytearray()
     byte_count = 0
     manifest = {}
+    index_builders: list = []
 
     def __init__(
         self,
@@ -32,10 +35,12 @@ class BlobWriter(object):
         blob_size: int = BLOB_SIZE,
         format: str = "parquet",
         schema: Optional[RelationSchema] = None,
+        index_on: Optional[List[str]] = None,
         **kwargs,
     ):
         self.format = format
         self.maximum_blob_size = blob_size
+        self.index_on = list(index_on or [])
 
         if format not in SUPPORTED_FORMATS_ALGORITHMS:
             raise ValueError(
@@ -53,6 +58,8 @@ class BlobWriter(object):
             self.append = self.text_append
 
     def arrow_append(self, record: dict = {}):
+        for index_builder in self.index_builders:
+            index_builder.add(self.records_in_buffer, record)
         self.records_in_buffer += 1
         self.wal.append(record)  # type:ignore
         # if this write would exceed the blob size, close it
@@ -92,6 +99,8 @@ class BlobWriter(object):
             get_logger().warning("Write buffer corrected from invalid state.")
         # write the record to the file
         self.buffer.extend(serialized)
+        for index_builder in self.index_builders:
+            index_builder.add(self.records_in_buffer, record)
         self.records_in_buffer += 1
 
         return self.records_in_buffer
@@ -181,6 +190,14 @@ class BlobWriter(object):
                 )
                 self.manifest[committed_blob_name] = summary
 
+                # write the indexes alongside the blob, the reader finds them by
+                # the blob name prefix and uses them to skip rows and blobs
+                for index_builder in self.index_builders:
+                    self.inner_writer.commit(
+                        byte_data=index_builder.build().bytes(),
+                        override_blob_name=f"{committed_blob_name}.{index_builder.column_name}.idx",
+                    )
+
                 if "BACKOUT" in committed_blob_name:
                     get_logger().warning(
                         f"{self.records_in_buffer:n} failed records written to BACKOUT partition `{committed_blob_name}`"
@@ -206,6 +223,7 @@ class BlobWriter(object):
         else:
             self.buffer = bytearray()
             self.byte_count = 0
+        self.index_builders = [IndexBuilder(column) for column in self.index_on]
         self.records_in_buffer = 0
 
     def __del__(self):
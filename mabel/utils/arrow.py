@@ -0,0 +1,40 @@
+"""
+Helpers for working with Arrow data.
+"""
+
+import datetime
+import decimal
+
+
+def is_string(data_type) -> bool:
+    import pyarrow  # type:ignore
+
+    return pyarrow.types.is_string(data_type) or pyarrow.types.is_large_string(data_type)
+
+
+def comparable(data_type, value) -> bool:
+    """
+    If the value can be compared to the column the same way in Arrow as it is when
+    the record is a dictionary.
+    """
+    import pyarrow  # type:ignore
+
+    if value is None:
+        return False
+    if pyarrow.types.is_boolean(data_type):
+        return isinstance(value, bool)
+    if pyarrow.types.is_integer(data_type):
+        # floats are compared exactly to integers in Python but not in Arrow
+        return isinstance(value, int) and not isinstance(value, bool)
+    if pyarrow.types.is_floating(data_type):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if pyarrow.types.is_decimal(data_type):
+        return isinstance(value, (int, decimal.Decimal)) and not isinstance(value, bool)
+    if is_string(data_type):
+        return isinstance(value, str)
+    if pyarrow.types.is_timestamp(data_type):
+        # comparing timestamps with and without timezones errors in both
+        return isinstance(value, datetime.datetime) and data_type.tz is None
+    if pyarrow.types.is_date(data_type):
+        return type(value) is datetime.date
+    return False
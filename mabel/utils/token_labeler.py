@@ -11,6 +11,8 @@ from functools import lru_cache
 
 from mabel.data.internals.group_by import AGGREGATORS
 from mabel.data.readers.internals.inline_functions import FUNCTIONS
+from mabel.utils.arrow import comparable
+from mabel.utils.arrow import is_string
 from mabel.utils.dates import parse_iso
 from mabel.utils.text import like
 from mabel.utils.text import matches
@@ -77,6 +79,115 @@ OPERATORS = {
 }
 
 
+# The operators applied to a whole Arrow column with a literal value. Each returns
+# the result for the rows which aren't null and a mask of the rows the result is
+# the same as the operator above for (None means all of them), or None if the
+# operator can't be applied to the column. IN is given its candidates, already
+# interpreted.
+
+
+def _ascii_lines(column):
+    # the regexes in Python and Arrow agree on ASCII strings without line breaks
+    import pyarrow.compute as pc  # type:ignore
+
+    return pc.and_(pc.string_is_ascii(column), pc.invert(pc.match_substring(column, "\n")))
+
+
+def _column_compare(function):
+    def column_compare(column, value):
+        import pyarrow  # type:ignore
+        import pyarrow.compute as pc  # type:ignore
+
+        if not comparable(column.type, value):
+            return None
+        return pc.call_function(function, [column, pyarrow.scalar(value)]), None
+
+    return column_compare
+
+
+def column_is(column, value):
+    # booleans are singletons, so for them `is` is the same as `==`
+    import pyarrow  # type:ignore
+    import pyarrow.compute as pc  # type:ignore
+
+    if not pyarrow.types.is_boolean(column.type) or not isinstance(value, bool):
+        return None
+    return pc.equal(column, value), None
+
+
+def column_is_not(column, value):
+    import pyarrow.compute as pc  # type:ignore
+
+    result = column_is(column, value)
+    return result and (pc.invert(result[0]), result[1])
+
+
+def column_like(column, value):
+    import pyarrow.compute as pc  # type:ignore
+
+    # a backslash is an escape in Arrow's LIKE but not ours
+    if not is_string(column.type) or not isinstance(value, str):
+        return None
+    if not value.isascii() or "\\" in value:
+        return None
+    return pc.match_like(column, value.lower(), ignore_case=True), _ascii_lines(column)
+
+
+def column_not_like(column, value):
+    import pyarrow.compute as pc  # type:ignore
+
+    result = column_like(column, value)
+    return result and (pc.invert(result[0]), result[1])
+
+
+def column_matches(column, value):
+    import pyarrow.compute as pc  # type:ignore
+
+    if not is_string(column.type) or not isinstance(value, str):
+        return None
+    return pc.match_substring_regex(column, value), _ascii_lines(column)
+
+
+def column_in(column, candidates):
+    import pyarrow  # type:ignore
+    import pyarrow.compute as pc  # type:ignore
+
+    if is_string(column.type):
+        # strings are never equal to the candidates which aren't strings
+        candidates = [candidate for candidate in candidates if isinstance(candidate, str)]
+    elif not all(comparable(column.type, candidate) for candidate in candidates):
+        return None
+    value_set = pyarrow.array(candidates) if candidates else pyarrow.array([], type=column.type)
+    return pc.is_in(column, value_set=value_set), None
+
+
+def column_contains(column, value):
+    import pyarrow.compute as pc  # type:ignore
+
+    if not is_string(column.type) or not isinstance(value, str):
+        return None
+    return pc.match_substring(column, value), None
+
+
+COLUMN_OPERATORS = {
+    "<>": _column_compare("not_equal"),
+    ">=": _column_compare("greater_equal"),
+    "<=": _column_compare("less_equal"),
+    ">": _column_compare("greater"),
+    "<": _column_compare("less"),
+    "==": _column_compare("equal"),
+    "!=": _column_compare("not_equal"),
+    "=": _column_compare("equal"),
+    "IS NOT": column_is_not,
+    "IS": column_is,
+    "NOT LIKE": column_not_like,
+    "LIKE": column_like,
+    "MATCHES": column_matches,
+    "IN": column_in,
+    "CONTAINS": column_contains,
+}
+
+
 class TOKENS(int):
     UNKNOWN = -1
     INTEGER = 0
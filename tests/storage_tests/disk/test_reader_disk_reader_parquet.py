@@ -1,4 +1,5 @@
 import os
+import shutil
 import sys
 
 sys.path.insert(1, os.path.join(sys.path[0], "../../.."))
@@ -22,7 +23,230 @@ def test_can_read_parquet():
     assert isinstance(r.first(), dict)
 
 
+def write_parquet_dataset():
+    import pyarrow
+    import pyarrow.parquet
+
+    shutil.rmtree("_temp/parquet", ignore_errors=True)
+    os.makedirs("_temp/parquet", exist_ok=True)
+    table = pyarrow.Table.from_pydict(
+        {
+            "id": list(range(1000)),
+            "name": [f"name-{i:04}" for i in range(1000)],
+            "wide": ["x" * 20] * 1000,
+        }
+    )
+    pyarrow.parquet.write_table(table, "_temp/parquet/data.parquet", row_group_size=100)
+
+
+def test_parquet_projection():
+    from mabel.data.readers.internals import decompressors
+
+    write_parquet_dataset()
+    with open("_temp/parquet/data.parquet", "rb") as f:
+        rows = list(decompressors.parquet(f, columns=["id", "missing"]))
+    assert len(rows) == 1000
+    assert rows[0] == {"id": 0}, rows[0]
+
+    r = Reader(
+        inner_reader=DiskReader,
+        dataset="_temp/parquet",
+        partitions=None,
+        select="name",
+        filters="id < 10",
+    )
+    # the filter is applied to the selected columns
+    assert len(list(r)) == 0
+
+    r = Reader(
+        inner_reader=DiskReader,
+        dataset="_temp/parquet",
+        partitions=None,
+        select="name, id",
+        filters="id < 10",
+    )
+    assert sorted(row["id"] for row in r) == list(range(10))
+
+
+def test_parquet_row_group_pruning():
+    from mabel.data.readers.internals import decompressors
+
+    write_parquet_dataset()
+    with open("_temp/parquet/data.parquet", "rb") as f:
+        rows = list(decompressors.parquet(f, filters=[("id", ">=", 950)]))
+    # only the last row group is read
+    assert len(rows) == 100, len(rows)
+
+    with open("_temp/parquet/data.parquet", "rb") as f:
+        rows = list(decompressors.parquet(f, filters=[[("id", "<", 5)], [("id", "in", [999])]]))
+    assert len(rows) == 200, len(rows)
+
+    with open("_temp/parquet/data.parquet", "rb") as f:
+        rows = list(decompressors.parquet(f, filters=[("name", "==", "nobody")]))
+    assert len(rows) == 0, len(rows)
+
+    with open("_temp/parquet/data.parquet", "rb") as f:
+        # strings and numbers can't be compared, so nothing is pruned
+        rows = list(decompressors.parquet(f, filters=[("name", "==", 7)]))
+    assert len(rows) == 1000, len(rows)
+
+    r = Reader(
+        inner_reader=DiskReader,
+        dataset="_temp/parquet",
+        partitions=None,
+        filters="name == 'name-0500' or id == 3",
+    )
+    assert sorted(row["id"] for row in r) == [3, 500]
+
+    r = Reader(
+        inner_reader=DiskReader,
+        dataset="_temp/parquet",
+        partitions=None,
+        filters=[("id", ">", 990), ("name", "in", ["name-0995", "name-0001"])],
+    )
+    assert [row["id"] for row in r] == [995]
+
+
+class CountingDiskReader(DiskReader):
+    downloads: list = []
+
+    def read_blob(self, blob_name):
+        CountingDiskReader.downloads.append(blob_name)
+        return super().read_blob(blob_name)
+
+
+def test_blob_ranges():
+    from mabel.data.readers.internals.base_inner_reader import BaseInnerReader
+
+    write_parquet_dataset()
+    blob = "_temp/parquet/data.parquet"
+    reader = CountingDiskReader(dataset="_temp/parquet")
+    with open(blob, "rb") as f:
+        data = f.read()
+
+    assert reader.get_blob_range(blob, 0, 4) == b"PAR1"
+    assert reader.get_blob_range(blob, 10, 20) == data[10:30]
+    assert reader.get_blob_range(blob, -8) == data[-8:]
+    assert reader.get_blob_range(blob, -len(data) - 10) == data
+    assert reader.get_blob_range(blob, 100) == data[100:]
+    # the fallback reads the whole blob
+    for start, length in ((0, 4), (10, 20), (-8, None), (-len(data) - 10, None), (100, None)):
+        fallback = BaseInnerReader.get_blob_range(reader, blob, start, length)
+        assert fallback == reader.get_blob_range(blob, start, length), (start, length)
+
+
+def test_parquet_footer_pruning():
+    from mabel.data.readers.internals import decompressors
+
+    write_parquet_dataset()
+    reader = CountingDiskReader(dataset="_temp/parquet")
+    metadata = decompressors.parquet_metadata(
+        lambda size: reader.get_blob_range("_temp/parquet/data.parquet", -size)
+    )
+    assert metadata.num_rows == 1000
+    assert metadata.num_row_groups == 10
+
+    CountingDiskReader.downloads = []
+    r = Reader(
+        inner_reader=CountingDiskReader,
+        dataset="_temp/parquet",
+        partitions=None,
+        filters="id > 5000",
+    )
+    assert len(list(r)) == 0
+    # the statistics in the footer rule out the blob, so it isn't downloaded
+    assert len(CountingDiskReader.downloads) == 0, CountingDiskReader.downloads
+
+    r = Reader(
+        inner_reader=CountingDiskReader,
+        dataset="_temp/parquet",
+        partitions=None,
+        filters="id > 995",
+    )
+    assert [row["id"] for row in r] == [996, 997, 998, 999]
+    assert len(CountingDiskReader.downloads) == 1, CountingDiskReader.downloads
+
+
+def test_parquet_footer_is_parsed_once():
+    import pyarrow.parquet
+
+    write_parquet_dataset()
+    parsed = []
+
+    class CountingParquetFile(pyarrow.parquet.ParquetFile):
+        def __init__(self, source, metadata=None, **kwargs):
+            super().__init__(source, metadata=metadata, **kwargs)
+            parsed.append(metadata is None)
+
+    original = pyarrow.parquet.ParquetFile
+    pyarrow.parquet.ParquetFile = CountingParquetFile
+    try:
+        r = Reader(
+            inner_reader=DiskReader,
+            dataset="_temp/parquet",
+            partitions=None,
+            filters="id > 995",
+        )
+        assert [row["id"] for row in r] == [996, 997, 998, 999]
+    finally:
+        pyarrow.parquet.ParquetFile = original
+    # the metadata read from the footer is reused when the blob is read
+    assert parsed == [False], parsed
+
+
+def test_parquet_batched_reads():
+    from mabel.data.readers.internals import decompressors
+
+    write_parquet_dataset()
+    with open("_temp/parquet/data.parquet", "rb") as f:
+        rows = decompressors.parquet(f, batch_size=7)
+        assert next(rows) == {"id": 0, "name": "name-0000", "wide": "x" * 20}
+        assert len(list(rows)) == 999
+
+    r = Reader(
+        inner_reader=DiskReader,
+        dataset="_temp/parquet",
+        partitions=None,
+        batch_size=33,
+    )
+    assert [row["id"] for row in r] == list(range(1000))
+
+
+def test_parquet_resume_from_cursor():
+    from mabel.data.readers.internals import decompressors
+
+    write_parquet_dataset()
+    with open("_temp/parquet/data.parquet", "rb") as f:
+        rows = decompressors.parquet(f, batch_size=30, start_row=345)
+        assert [row["id"] for row in rows] == list(range(345, 1000))
+
+    filters = "id > 150 and id < 700"
+    r = Reader(inner_reader=DiskReader, dataset="_temp/parquet", partitions=None, filters=filters)
+    tracker = [next(r)["id"] for i in range(300)]
+    cursor = r.cursor.get()
+    # the row is counted from the first row group the filter doesn't rule out
+    assert cursor["location"] == 299
+    assert cursor["row"] == 350, cursor
+
+    r = Reader(
+        inner_reader=DiskReader,
+        dataset="_temp/parquet",
+        partitions=None,
+        filters=filters,
+        cursor=cursor,
+    )
+    tracker += [row["id"] for row in r]
+    assert tracker == list(range(151, 700))
+
+
 if __name__ == "__main__":  # pragma: no cover
     test_can_read_parquet()
+    test_parquet_projection()
+    test_parquet_row_group_pruning()
+    test_blob_ranges()
+    test_parquet_footer_pruning()
+    test_parquet_footer_is_parsed_once()
+    test_parquet_batched_reads()
+    test_parquet_resume_from_cursor()
 
     print("okay")
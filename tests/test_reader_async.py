@@ -0,0 +1,88 @@
+"""
+Test the async methods of the inner readers
+"""
+
+import asyncio
+import os
+import pathlib
+import sys
+import time
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+from mabel.adapters.disk import DiskReader
+from mabel.data import Reader
+from rich import traceback
+
+traceback.install()
+
+PARTITIONS = ["year_{yyyy}/month_{mm}/day_{dd}"]
+
+
+class SlowReader(DiskReader):
+    """
+    A DiskReader with latency, which keeps track of the requests in flight
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    def get_blob_bytes(self, blob_name: str) -> bytes:
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        time.sleep(0.05)
+        self.in_flight -= 1
+        return super().get_blob_bytes(blob_name)
+
+
+def test_async_list_and_fetch():
+    reader = DiskReader(dataset="tests/data/tweets")
+    blobs = asyncio.run(reader.async_get_blobs_at_path(pathlib.Path("tests/data/tweets")))
+    assert sorted(blobs) == sorted(reader.get_blobs_at_path(pathlib.Path("tests/data/tweets")))
+
+    blob = sorted(blobs)[0]
+    assert asyncio.run(reader.async_get_blob_bytes(blob)) == reader.get_blob_bytes(blob)
+    assert asyncio.run(reader.async_read_blob(blob)).read() == reader.get_blob_bytes(blob)
+
+
+def test_async_fetch_concurrency_is_limited():
+    reader = SlowReader(dataset="tests/data/nvd", max_concurrency=3)
+    blobs = reader.get_blobs_at_path(pathlib.Path("tests/data/nvd")) * 3
+
+    async def fetch_all():
+        return await asyncio.gather(*(reader.async_get_blob_bytes(blob) for blob in blobs))
+
+    assert len(asyncio.run(fetch_all())) == len(blobs)
+    assert reader.most_in_flight == 3, reader.most_in_flight
+
+
+def test_reader_with_deep_prefetch():
+    expected = len(list(Reader(inner_reader=DiskReader, dataset="tests/data/nvd", partitions=[])))
+    r = Reader(inner_reader=DiskReader, dataset="tests/data/nvd", partitions=[], prefetch=32)
+    assert len(list(r)) == expected
+
+
+def test_listing_across_dates():
+    # the dates are listed concurrently, the blobs should be the same as listed one by one
+    reader = DiskReader(
+        dataset="tests/data/dated",
+        partitions=PARTITIONS,
+        start_date="2020-12-20",
+        end_date="2020-12-23",
+    )
+    blobs = reader.get_list_of_blobs()
+    one_by_one = []
+    for day in ("2020-12-20", "2020-12-21", "2020-12-22", "2020-12-23"):
+        day_reader = DiskReader(
+            dataset="tests/data/dated", partitions=PARTITIONS, start_date=day, end_date=day
+        )
+        one_by_one.extend(day_reader.get_list_of_blobs())
+    assert sorted(blobs) == sorted(one_by_one)
+    assert len(blobs) > 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from tests.helpers.runner import run_tests
+
+    run_tests()
@@ -0,0 +1,122 @@
+"""
+Test JSON lines are parsed in batches when the schema is known
+"""
+
+import os
+import sys
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+from mabel.adapters.disk import DiskReader
+from mabel.data import Reader
+from mabel.data.readers.internals import parsers
+from mabel.data.validator import schema_loader
+from rich import traceback
+
+traceback.install()
+
+# fmt: off
+SCHEMA = [
+    {"name": "userid", "type": "INTEGER"},
+    {"name": "username", "type": "VARCHAR"},
+    {"name": "user_verified", "type": "BOOLEAN"},
+    {"name": "sentiment", "type": "DOUBLE"},
+    {"name": "timestamp", "type": "TIMESTAMP"},
+]
+# fmt: on
+
+
+def read(**kwargs):
+    return list(
+        Reader(inner_reader=DiskReader, dataset="tests/data/tweets", partitions=[], **kwargs)
+    )
+
+
+def test_json_batch():
+    lines = [b'{"a": 1, "b": "2020-01-01T00:00:00"}', memoryview(b'{"a": 2, "c": [1]}')]
+    schema = parsers.arrow_schema(
+        schema_loader([{"name": "a", "type": "INTEGER"}, {"name": "b", "type": "TIMESTAMP"}])
+    )
+    batch = parsers.json_batch(lines, schema, columns=["a", "b"])
+    assert batch.num_rows == 2
+    # timestamps are left as strings, missing values are None
+    assert batch.to_pylist() == [
+        {"a": 1, "b": "2020-01-01T00:00:00"},
+        {"a": 2, "b": None},
+    ]
+    # columns which aren't in the schema are only kept if they're unchanged, `c`
+    # would be None in the first line
+    assert parsers.json_batch(lines, schema) is None
+    lines = [b'{"a": 1, "n": {"p": 1}, "m": 1}', b'{"a": 2, "n": {"q": 2}, "m": 2.5}']
+    assert parsers.json_batch(lines, schema) is None
+    assert parsers.json_batch(lines, schema, columns=["m"]) is None
+    assert parsers.json_batch(lines, schema, columns=["a"]).to_pylist() == [{"a": 1}, {"a": 2}]
+    lines = [b'{"a": 1, "c": ["x"], "d": true}', b'{"a": 2, "c": [], "d": false}']
+    assert parsers.json_batch(lines, schema, columns=["a", "c", "d"]).to_pylist() == [
+        {"a": 1, "c": ["x"], "d": True},
+        {"a": 2, "c": [], "d": False},
+    ]
+
+
+def test_batched_parsing_matches_line_parsing():
+    assert read(schema=SCHEMA) == read()
+    assert read(schema=SCHEMA, batch_size=7) == read()
+
+    select = "username, followers"
+    filters = "followers > 1000000 and user_verified = true"
+    assert read(schema=SCHEMA, select=select, filters=filters) == read(
+        select=select, filters=filters
+    )
+
+
+def test_batched_parsing_keeps_the_values_of_other_columns():
+    import orjson
+
+    os.makedirs("_temp/batched", exist_ok=True)
+    lines = [{"a": 1, "n": {"p": 1}, "m": 1}, {"a": 2, "n": {"q": 2}, "m": 2.5}]
+    with open("_temp/batched/data.jsonl", "wb") as file:
+        file.write(b"\n".join(map(orjson.dumps, lines)))
+    records = Reader(
+        inner_reader=DiskReader,
+        dataset="_temp/batched",
+        partitions=[],
+        schema=[{"name": "a", "type": "INTEGER"}],
+    )
+    assert list(records) == lines
+
+
+def test_batched_parsing_falls_back():
+    # the usernames aren't integers, so the lines are parsed one at a time
+    schema = [{"name": "username", "type": "INTEGER"}]
+    assert read(schema=schema) == read()
+
+
+def test_batched_parsing_with_cursor():
+    expected = [row["tweet"] for row in read()]
+
+    r = Reader(
+        inner_reader=DiskReader,
+        dataset="tests/data/tweets",
+        partitions=[],
+        schema=SCHEMA,
+        batch_size=10,
+    )
+    tracker = [next(r)["tweet"] for i in range(13)]
+    cursor = r.cursor.get()
+    assert cursor["location"] == 12, cursor
+
+    r = Reader(
+        inner_reader=DiskReader,
+        dataset="tests/data/tweets",
+        partitions=[],
+        schema=SCHEMA,
+        batch_size=10,
+        cursor=cursor,
+    )
+    tracker += [row["tweet"] for row in r]
+    assert tracker == expected
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from tests.helpers.runner import run_tests
+
+    run_tests()
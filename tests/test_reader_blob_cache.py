@@ -0,0 +1,74 @@
+"""
+Test the local blob cache
+"""
+
+import datetime
+import glob
+import os
+import shutil
+import sys
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+from mabel.adapters.disk import DiskReader
+from mabel.data import Reader
+from mabel.data.readers.internals.blob_cache import BlobCache
+from rich import traceback
+
+traceback.install()
+
+CACHE = "_temp/blob_cache"
+
+
+def test_blob_cache_fetches_once():
+    shutil.rmtree(CACHE, ignore_errors=True)
+    cache = BlobCache(CACHE, max_size=1024)
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return b"one\ntwo"
+
+    assert cache.read("blob", fetch).read() == b"one\ntwo"
+    assert cache.read("blob", fetch).read() == b"one\ntwo"
+    assert len(fetches) == 1
+
+
+def test_blob_cache_evicts_least_recently_read():
+    shutil.rmtree(CACHE, ignore_errors=True)
+    cache = BlobCache(CACHE, max_size=250)
+    cache.read("first", lambda: b"1" * 100)
+    cache.read("second", lambda: b"2" * 100)
+    # make sure the modified times are different
+    os.utime(cache._path("first"), (0, 0))
+    cache.read("third", lambda: b"3" * 100)
+
+    assert not os.path.exists(cache._path("first"))
+    assert os.path.exists(cache._path("second"))
+    assert os.path.exists(cache._path("third"))
+
+
+def test_reader_caches_complete_frames():
+    shutil.rmtree(CACHE, ignore_errors=True)
+    DATA_DATE = datetime.date(2021, 3, 28)
+
+    def read():
+        return list(
+            Reader(
+                dataset="tests/data/framed",
+                inner_reader=DiskReader,
+                start_date=DATA_DATE,
+                end_date=DATA_DATE,
+                blob_cache_directory=CACHE,
+            )
+        )
+
+    first = read()
+    assert len(glob.glob(f"{CACHE}/*.blob")) == 1
+    # the second read is from the cache
+    assert read() == first
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from tests.helpers.runner import run_tests
+
+    run_tests()
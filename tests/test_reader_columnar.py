@@ -0,0 +1,191 @@
+"""
+Test rows are filtered out of Arrow batches before they're converted to records
+"""
+
+import datetime
+import os
+import sys
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+import pyarrow
+from mabel.adapters.disk import DiskReader
+from mabel.data import Reader
+from mabel.data.readers.internals.columnar import predicate_mask
+from mabel.data.readers.internals.parallel_reader import batch_records
+from rich import traceback
+
+traceback.install()
+
+# fmt: off
+BATCH = pyarrow.RecordBatch.from_pydict(
+    {
+        "id": [1, 2, 3, 4, None],
+        "name": ["a", "b", "c", "d", "e"],
+        "score": [1.5, 2.5, None, 4.5, 5.5],
+        "when": [datetime.datetime(2020, 1, day) for day in range(1, 6)],
+    }
+)
+# fmt: on
+
+
+def mask(predicates):
+    result = predicate_mask(BATCH, predicates)
+    return None if result is None else result.to_pylist()
+
+
+def test_predicate_mask():
+    assert mask([("id", ">", 2)]) == [False, False, True, True, True]
+    assert mask([("id", ">", 2), ("name", "!=", "d")]) == [False, False, True, False, True]
+    assert mask([[("id", "==", 1)], [("name", "in", ["c", "e"])]]) == [
+        True,
+        False,
+        True,
+        False,
+        True,
+    ]
+    assert mask([("name", "not in", ("a", "b"))]) == [False, False, True, True, True]
+    assert mask([("score", "<=", 2.5)]) == [True, True, True, False, False]
+    assert mask([("when", "<", datetime.datetime(2020, 1, 3))]) == [
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_predicate_mask_only_removes_rows_it_can():
+    # operators without kernels, values of other types and missing columns
+    assert mask([("name", "like", "a%")]) is None
+    assert mask([("name", "==", 1)]) is None
+    assert mask([("id", "==", 1.0)]) is None
+    assert mask([("missing", "==", 1)]) is None
+    assert mask([("name", "in", ["a", 1])]) is None
+    assert mask([]) is None
+    # ANDed predicates use the ones they can, ORed predicates need all of them
+    assert mask([("name", "like", "a%"), ("id", "<", 3)]) == [True, True, False, False, True]
+    assert mask([[("name", "like", "a%")], [("id", "<", 3)]]) is None
+
+
+def test_batch_records_counts_rows():
+    import collections
+
+    class Counter:
+        row = None
+
+    counter = Counter()
+    seen = []
+    records = batch_records(
+        [BATCH, [{"id": 9}], BATCH], [("id", "==", 4)], counter=counter, start_row=10
+    )
+    for record in records:
+        seen.append((counter.row, record["id"]))
+    # nulls are left for the row filters
+    assert seen == [(13, 4), (14, None), (15, 9), (19, 4), (20, None)], seen
+
+    # the offsets of the rows removed are skipped
+    offsets = collections.deque((row + 1) * 10 for row in range(10, 21))
+    seen = []
+    records = batch_records(
+        [BATCH, [{"id": 9}], BATCH],
+        [("id", "==", 4)],
+        counter=counter,
+        start_row=10,
+        offsets=offsets,
+    )
+    for record in records:
+        seen.append((counter.row, counter.offset))
+    assert seen == [(13, 140), (14, 150), (15, 160), (19, 200), (20, 210)], seen
+
+
+def write_parquet_dataset():
+    import pyarrow.parquet
+
+    os.makedirs("_temp/columnar", exist_ok=True)
+    table = pyarrow.Table.from_pydict(
+        {
+            "id": list(range(1000)),
+            "name": [f"name-{i % 7}" for i in range(1000)],
+            "score": [None if i % 5 == 0 else i / 3 for i in range(1000)],
+        }
+    )
+    pyarrow.parquet.write_table(table, "_temp/columnar/data.parquet", row_group_size=300)
+
+
+def test_filtered_parquet_reads_match_row_filters():
+    write_parquet_dataset()
+
+    def read(filters, **kwargs):
+        return list(
+            Reader(
+                inner_reader=DiskReader,
+                dataset="_temp/columnar",
+                partitions=None,
+                filters=filters,
+                **kwargs,
+            )
+        )
+
+    for filters, function in (
+        ([("name", "==", "name-3")], lambda r: r["name"] == "name-3"),
+        ([("score", "!=", 10)], lambda r: r["score"] is not None and r["score"] != 10),
+        (
+            [[("id", "<", 10)], [("name", "like", "%6")]],
+            lambda r: r["id"] < 10 or r["name"] == "name-6",
+        ),
+        ("id > 500 AND name = 'name-1'", lambda r: r["id"] > 500 and r["name"] == "name-1"),
+        ("id < 20 OR score > 300", lambda r: r["id"] < 20 or (r["score"] or 0) > 300),
+        (
+            "NOT (name LIKE '%3' OR score < 10) AND id < 100",
+            lambda r: not (r["name"] == "name-3" or (r["score"] or 10) < 10) and r["id"] < 100,
+        ),
+    ):
+        assert read(filters) == [row for row in read(None) if function(row)], filters
+
+    assert read("id > 500 AND name = 'name-1'", select="id, name", batch_size=64) == [
+        {"id": row["id"], "name": row["name"]}
+        for row in read(None)
+        if row["id"] > 500 and row["name"] == "name-1"
+    ]
+
+
+def test_filters_on_selected_functions_are_not_pushed_down():
+    write_parquet_dataset()
+    records = Reader(
+        inner_reader=DiskReader,
+        dataset="_temp/columnar",
+        partitions=None,
+        select="UPPER(name) as name, id",
+        filters="name = 'NAME-3' and id < 20",
+    )
+    assert [record["id"] for record in records] == [3, 10, 17]
+
+
+def test_filters_on_fields_which_are_not_selected_are_not_pushed_down():
+    write_parquet_dataset()
+
+    def read(select, filters):
+        return list(
+            Reader(
+                inner_reader=DiskReader,
+                dataset="_temp/columnar",
+                partitions=None,
+                select=select,
+                filters=filters,
+            )
+        )
+
+    # the filters see the selected records, which don't have the id
+    assert len(read("name", "NOT id = 5")) == 1000
+    assert len(read("name", [("id", "!=", 5)])) == 0
+    assert len(read("name, *", "NOT id = 5")) == 999
+
+    # the same as a select followed by a filter on the DictSet
+    reader = Reader(inner_reader=DiskReader, dataset="_temp/columnar", partitions=None)
+    assert len(list(reader.select(["name"]).filter("NOT id = 5"))) == 1000
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from tests.helpers.runner import run_tests
+
+    run_tests()
@@ -226,6 +226,157 @@ def test_multiple_files():
     assert counter == records
 
 
+def test_cursor_with_prefetch():
+    """
+    Prefetching blobs shouldn't change the order records are read in, or how the
+    cursor resumes
+    """
+    expected = [
+        r["tweet"]
+        for r in Reader(inner_reader=DiskReader, dataset="tests/data/tweets", partitions=[])
+    ]
+
+    reader = Reader(inner_reader=DiskReader, dataset="tests/data/tweets", partitions=[], prefetch=2)
+    assert [r["tweet"] for r in reader] == expected
+
+    for offset in (1, 24, 26, 40):
+        reader = Reader(
+            inner_reader=DiskReader, dataset="tests/data/tweets", partitions=[], prefetch=1
+        )
+        tracker = [next(reader)["tweet"] for i in range(offset)]
+        cursor = str(reader.cursor)
+
+        reader = Reader(
+            inner_reader=DiskReader,
+            dataset="tests/data/tweets",
+            partitions=[],
+            prefetch=1,
+            cursor=cursor,
+        )
+        tracker += [r["tweet"] for r in reader]
+        assert tracker == expected, offset
+
+
+def test_cursor_seeks_to_row():
+    """
+    The cursor records the row each record came from, so a filtered read can be
+    resumed without reading the records before the cursor again
+    """
+    filters = "username == 'BBCNews'"
+    expected = [
+        r["tweet"]
+        for r in Reader(
+            inner_reader=DiskReader, dataset="tests/data/tweets", partitions=[], filters=filters
+        )
+    ]
+
+    reader = Reader(
+        inner_reader=DiskReader, dataset="tests/data/tweets", partitions=[], filters=filters
+    )
+    tracker = [next(reader)["tweet"] for i in range(2)]
+    cursor = reader.cursor.get()
+    assert cursor["row"] > cursor["location"] >= 0
+
+    reader = Reader(
+        inner_reader=DiskReader,
+        dataset="tests/data/tweets",
+        partitions=[],
+        filters=filters,
+        cursor=cursor,
+    )
+    tracker += [r["tweet"] for r in reader]
+    assert tracker == expected
+
+
+def test_cursor_seeks_to_offset():
+    """
+    Line formats record the byte offset of the row in the cursor, so the read can
+    be resumed without splitting the lines before it
+    """
+    expected = [
+        r["cve.CVE_data_meta.ID"]
+        for r in Reader(inner_reader=DiskReader, dataset="tests/data/nvd", partitions=[])
+    ]
+
+    for offset in (1, 150, 600):
+        reader = Reader(inner_reader=DiskReader, dataset="tests/data/nvd", partitions=[])
+        tracker = [next(reader)["cve.CVE_data_meta.ID"] for i in range(offset)]
+        cursor = reader.cursor.get()
+        assert cursor["offset"] > cursor["row"] >= 0, cursor
+
+        reader = Reader(
+            inner_reader=DiskReader, dataset="tests/data/nvd", partitions=[], cursor=cursor
+        )
+        tracker += [r["cve.CVE_data_meta.ID"] for r in reader]
+        assert tracker == expected, offset
+
+
+def test_cursor_with_blobs_in_flight():
+    """
+    Blobs read concurrently are each partially read, the cursor needs to record
+    where we are in each of them
+    """
+    from mabel.data.readers.internals.cursor import Cursor
+
+    blobs = ["a", "b", "c", "d"]
+    cursor = Cursor(readable_blobs=blobs)
+    assert cursor.blobs_to_read() == [
+        ("a", 0, 0, 0),
+        ("b", 0, 0, 0),
+        ("c", 0, 0, 0),
+        ("d", 0, 0, 0),
+    ]
+
+    for i in range(3):
+        cursor.record_read("b", row=i * 2, offset=i * 20 + 20)
+    cursor.record_read("c")
+    cursor.complete_blob("a")
+
+    # resuming concurrently skips the records we've read from the blobs in flight
+    resumed = Cursor(readable_blobs=blobs, cursor=str(cursor))
+    assert resumed.blobs_to_read() == [("b", 3, 5, 60), ("c", 1, None, 0), ("d", 0, 0, 0)]
+
+    # resuming serially reads the blobs in flight first, from where we left off
+    resumed = Cursor(readable_blobs=blobs, cursor=cursor.get())
+    assert resumed.next_blob() == "b"
+    assert resumed.location == 2
+    assert resumed.start_row() == 5
+    assert resumed.start_byte() == 60
+    assert resumed.next_blob("b") == "c"
+    assert resumed.location == 0
+    assert resumed.start_row() is None
+    assert resumed.next_blob("c") == "d"
+    assert resumed.location == -1
+    assert resumed.next_blob("d") is None
+
+    # cursors without blobs in flight are unchanged
+    cursor.complete_blob("b")
+    cursor.complete_blob("c")
+    assert "in_flight" not in cursor.get()
+
+
+def test_cursor_map_round_trip():
+    """
+    Blobs marked as read in any order should survive the cursor being serialized
+    """
+    from mabel.data.readers.internals.cursor import Cursor
+
+    blobs = [f"blob-{i:02}" for i in range(20)]
+    cursor = Cursor(readable_blobs=blobs)
+    for blob in ("blob-00", "blob-01", "blob-07", "blob-19"):
+        cursor.complete_blob(blob)
+
+    resumed = Cursor(readable_blobs=blobs, cursor=str(cursor))
+    assert resumed.read_blobs == ["blob-00", "blob-01", "blob-07", "blob-19"]
+    assert resumed.unread_count() == 16
+    assert resumed.next_blob() == "blob-02"
+    assert resumed.peek_blobs(5) == ["blob-03", "blob-04", "blob-05", "blob-06", "blob-08"]
+
+    # blobs added since the cursor was created are unread
+    resumed = Cursor(readable_blobs=blobs + ["blob-20"], cursor=str(cursor))
+    assert resumed.unread_count() == 17
+
+
 if __name__ == "__main__":  # pragma: no cover
     from helpers.runner import run_tests
 
@@ -4,7 +4,9 @@ the .query() method on the DictSet, this makes handling the data we're querying
 easier to handle.
 """
 
+import datetime
 import os
+import pickle
 import sys
 
 sys.path.insert(1, os.path.join(sys.path[0], ".."))
@@ -60,6 +62,79 @@ def test_as():
     assert res == {"upper_name": "SIRIUS BLACK"}
 
 
+def test_constants():
+    pf = "name, 1, 1.5, 'text', '2020-01-02', true, null"
+    res = Evaluator(pf)(TEST_DATA)
+    assert res == {
+        "name": "Sirius Black",
+        "1": 1,
+        "1.5": 1.5,
+        "'text'": "text",
+        "'2020-01-02'": datetime.datetime(2020, 1, 2),
+        "true": True,
+        "null": None,
+    }, res
+
+
+def test_everything_copies_the_record():
+    import orjson
+
+    record = dict(TEST_DATA)
+    res = Evaluator("UPPER(name) as upper_name, *")(record)
+    assert res == {**TEST_DATA, "upper_name": "SIRIUS BLACK", "*": "*"}, res
+    assert list(res.keys()) == list(TEST_DATA.keys()) + ["upper_name", "*"]
+    assert res["age"] == 40 and res.get("upper_name") == "SIRIUS BLACK"
+    assert res.get("missing") is None and "missing" not in res
+    # changing the result doesn't change the record
+    res["age"] = 41
+    del res["name"]
+    assert record == TEST_DATA
+    expected = {**TEST_DATA, "age": 41, "upper_name": "SIRIUS BLACK", "*": "*"}
+    del expected["name"]
+    assert res == expected
+    # the result is a dictionary, so it can be serialized
+    assert type(res) is dict
+    assert orjson.loads(orjson.dumps(res)) == expected
+
+
+def test_evaluators_can_be_pickled():
+    evaluator = pickle.loads(pickle.dumps(Evaluator("UPPER(name), age")))
+    assert evaluator(TEST_DATA) == {"UPPER(name)": "SIRIUS BLACK", "age": 40}
+
+
+def test_filters_are_applied_before_the_rest_of_the_select():
+    from mabel.data.internals.expression import Expression
+    from mabel.data.readers.internals.inline_functions import FUNCTIONS
+
+    calls = []
+    md5 = FUNCTIONS["MD5"]
+    FUNCTIONS["MD5"] = lambda value: calls.append(value) or md5(value)
+    try:
+        evaluator = Evaluator("MD5(name) as digest, UPPER(name) as name, *")
+    finally:
+        FUNCTIONS["MD5"] = md5
+
+    records = [dict(TEST_DATA, age=age) for age in range(100)]
+    for filters in ("age < 3", "name = 'SIRIUS BLACK' and age < 3", "digest is none or age > 96"):
+        expression = Expression(filters)
+        expected = [r for r in map(evaluator, records) if expression(r)]
+        calls.clear()
+        results = list(evaluator.filtered(expression)(records))
+        assert results == expected, filters
+        assert len(calls) <= 3 or filters.startswith("digest"), filters
+
+
+def test_fields_which_pass_through_the_select():
+    evaluator = Evaluator("name, UPPER(name) as upper_name, `age`")
+    assert evaluator.passes_through({"name"})
+    assert not evaluator.passes_through({"name", "upper_name"})
+    assert not evaluator.passes_through({"age"})
+    assert not evaluator.passes_through({"alive"})
+    evaluator = Evaluator("UPPER(name) as name, *")
+    assert evaluator.passes_through({"age", "alive"})
+    assert not evaluator.passes_through({"name"})
+
+
 if __name__ == "__main__":  # pragma: no cover
     from tests.helpers.runner import run_tests
 
@@ -73,6 +73,81 @@ def test_simple_compound_expressions():
     assert DATA.filter("name like '%Potter' or alive == true").count() == 5
 
 
+def test_expressions_interpret_fields():
+    # fields which look like numbers, booleans and dates are compared as those types
+    assert Expression("age > 10")({"age": "11"})
+    assert Expression("age == 1.5")({"age": " 1.5"})
+    assert Expression("alive == true")({"alive": "TRUE"})
+    assert Expression("dob == '1999-07-30'")({"dob": "1999-07-30"})
+    assert Expression("dob < '1999-08-01'")({"dob": "1999-07-30"})
+    assert not Expression("age == '11'")({"age": "11"})
+    assert Expression("age in (10, 11)")({"age": "11"})
+    assert not Expression("age in (10, 11)")({"age": [11]})
+    # missing fields are None
+    assert Expression("name != 'James Potter'")({})
+    assert Expression("name is none")({})
+    # comparisons of different types aren't errors
+    assert not Expression("name > 10")({"name": "James Potter"})
+
+
+def test_expressions_over_columns():
+    import numpy
+    import pyarrow
+
+    table = pyarrow.Table.from_pylist(TEST_DATA)
+    for expression in (
+        "name == 'James Potter'",
+        "age > 10 and alive == true",
+        "not age == 11 or name like '%potter%'",
+        "name matches '^H' or gender in ('female', 1)",
+        "affiliations is none",
+        "dob < '1990-01-01'",
+        "name contains 'ry'",
+        "missing = 1 or age <= 10",
+    ):
+        exp = Expression(expression)
+        expected = [bool(exp(record)) for record in TEST_DATA]
+        assert exp.evaluate_columns(table).to_pylist() == expected, expression
+
+    # numpy arrays are evaluated as Arrow arrays
+    columns = {"age": numpy.array([40, 11, 10]), "name": numpy.array(["a", "10", "b"])}
+    assert Expression("age > 10 or name = 10").evaluate_columns(columns).to_pylist() == [
+        True,
+        True,
+        False,
+    ]
+
+
+def test_expressions_can_be_pickled():
+    import pickle
+
+    expression = pickle.loads(pickle.dumps(Expression("`name` == 'James Potter' and age > 1")))
+    assert expression({"name": "James Potter", "age": 40})
+    assert not expression({"name": "James Potter", "age": 0})
+    # evaluating doesn't change the tree
+    assert expression.to_dnf()[0] == ("`name`", "==", '"James Potter"')
+
+
+def test_expressions_reorder_terms():
+    records = [{"age": i % 7, "name": f"name-{i}"} for i in range(4096)]
+    expression = Expression("name like '%1%' and name like '%-%' and age = 3")
+    expected = [r for r in records if "1" in r["name"] and r["age"] == 3]
+    assert [r for r in records if expression(r)] == expected
+    statistics = expression.statistics()
+    assert len(statistics) == 3
+    assert statistics[-1]["term"] == "name LIKE '%-%'", statistics
+
+    # ORed terms put the terms which pass records first
+    expression = Expression("age = 9 or age < 9")
+    assert [r for r in records if expression(r)] == [r for r in records if r["age"] < 9]
+    assert expression.statistics()[0]["term"] == "age < 9", expression.statistics()
+
+    # terms we can guess how often are true for are put in order up front
+    expression = Expression("age != 2 and name = 'name-3' and age = 3")
+    assert [r for r in records if expression(r)] == [{"age": 3, "name": "name-3"}]
+    assert expression.statistics() == []
+
+
 if __name__ == "__main__":  # pragma: no cover
     from tests.helpers.runner import run_tests
 
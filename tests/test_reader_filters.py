@@ -114,6 +114,70 @@ def test_combined_filters():
     assert len([a for a in filter08.filter_dictset(TEST_DATA)]) == 1
 
 
+def test_compiled_filters():
+    import pickle
+
+    from mabel.data.internals.dnf_filters import evaluate
+
+    # fmt: off
+    PREDICATES = [
+        ("name", "like", "james%"),
+        ("name", "like", "%POTTER"),
+        ("name", "like", "%s p%"),
+        ("name", "like", "h_rry potter"),
+        ("name", "like", "harry potter"),
+        ("name", "matches", "^H"),
+        ("gender", "in", ["female", "other"]),
+        ("affiliations", "in", [["OotP"]]),
+        ("affiliations", "not in", (["OotP"], 1)),
+        ("age", "<", 11),
+        ("dob", "~", "-12-"),
+    ]
+    # fmt: on
+    records = TEST_DATA + [{"name": "james\npotter"}, {"name": "harry potter\n"}]
+    for predicate in PREDICATES:
+        for predicates in (predicate, [predicate], [[predicate], [("age", ">", 30)]]):
+            compiled = DnfFilters(predicates)
+            expected = [bool(evaluate(predicates, record)) for record in records]
+            assert [bool(compiled(record)) for record in records] == expected, predicates
+            compiled = pickle.loads(pickle.dumps(compiled))
+            assert [bool(compiled(record)) for record in records] == expected, predicates
+
+    # the cheap predicates are run first, but errors are the same as running them in order
+    ordered = DnfFilters([("name", "matches", "^H"), ("age", "==", 10)])
+    assert not ordered({"name": 1, "age": 11})
+    try:
+        DnfFilters([("name", "matches", "^H"), ("age", "==", 10)])({"name": 1, "age": 10})
+        assert False, "matching a number should fail"
+    except TypeError:
+        pass
+
+
+def test_adaptive_filters():
+    records = [{"age": i % 7, "name": str(i)} for i in range(4096)]
+
+    # the term which removes records is moved before the one which never does
+    filters = DnfFilters([("age", "<", 7), ("age", "==", 3)])
+    assert list(filters.filter_dictset(records)) == [r for r in records if r["age"] == 3]
+    statistics = filters.statistics()
+    assert [entry["term"] for entry in statistics] == ["age == 3", "age < 7"], statistics
+    assert statistics[0]["samples"] == 64
+    assert 0.1 < statistics[0]["pass_rate"] < 0.2, statistics
+
+    # ORed terms put the terms which pass records first
+    filters = DnfFilters([[("age", "==", 9)], [("age", "<", 6)]])
+    assert list(filters.filter_dictset(records)) == [r for r in records if r["age"] < 6]
+    assert filters.statistics()[0]["term"] == "age < 6", filters.statistics()
+
+    # equality and inequality predicates cost the same, the order is decided up front
+    filters = DnfFilters([("age", "!=", 2), ("name", "==", "3"), ("age", "==", 3)])
+    assert list(filters.filter_dictset(records)) == [{"age": 3, "name": "3"}]
+    assert filters.statistics() == []
+    filters = DnfFilters([[("age", "==", 2)], [("age", "==", 3), ("age", "<", 5)]])
+    assert len(list(filters.filter_dictset(records))) == 1170
+    assert [entry["operator"] for entry in filters.statistics()] == ["AND", "AND", "OR", "OR"]
+
+
 if __name__ == "__main__":  # pragma: no cover
     from tests.helpers.runner import run_tests
 
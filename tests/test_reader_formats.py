@@ -1,4 +1,7 @@
+import io
+import mmap
 import os
+import pathlib
 import sys
 
 sys.path.insert(1, os.path.join(sys.path[0], ".."))
@@ -47,6 +50,79 @@ def test_reader_can_read_zipped_csv():
         assert keys == r.keys(), r.keys()
 
 
+def test_zstd_decompressor_streams_lines():
+    import io
+    import zstandard
+    from mabel.data.readers.internals import decompressors
+
+    data = b"\n".join(f'{{"line": {i}}}'.encode() for i in range(1000)) + b"\n"
+    compressed = zstandard.compress(data)
+
+    for chunk_size in (1, 7, 1024, None):
+        lines = list(decompressors.zstd(io.BytesIO(compressed), chunk_size=chunk_size))
+        assert lines == data.split(b"\n")[:-1], chunk_size
+
+    # the last line doesn't need a line break
+    lines = list(decompressors.zstd(io.BytesIO(zstandard.compress(b"one\ntwo")), chunk_size=2))
+    assert lines == [b"one", b"two"]
+
+
+def test_lines_decompressor_splits_without_copying():
+    from mabel.data.readers.internals import decompressors
+
+    data = b'{"line": 1}\n{"line": 2}\r\n\n{"line": 4}'
+    lines = list(decompressors.lines(io.BytesIO(data)))
+    assert all(isinstance(line, memoryview) for line in lines)
+    assert [bytes(line) for line in lines] == data.splitlines()
+    assert [bytes(line) for line in decompressors.lines(io.BytesIO(data), start_row=3)] == [
+        b'{"line": 4}'
+    ]
+    assert list(decompressors.lines(io.BytesIO(b""))) == []
+
+    # local files are memory mapped, and the lines are views of the map
+    reader = DiskReader(dataset="tests/data/tweets")
+    blob = sorted(reader.get_blobs_at_path(pathlib.Path("tests/data/tweets")))[0]
+    stream = reader.read_blob(blob)
+    assert isinstance(stream, mmap.mmap)
+    lines = list(decompressors.lines(stream))
+    assert [bytes(line) for line in lines] == reader.get_blob_bytes(blob).splitlines()
+
+
+def test_decompressors_record_and_seek_to_offsets():
+    import collections
+
+    import zstandard  # type:ignore
+    from mabel.data.readers.internals import decompressors
+
+    data = b'{"line": 1}\n{"line": 2}\r\n\n{"line": 4}'
+    expected = data.splitlines()
+    for decompressor, blob in (
+        (decompressors.lines, data),
+        (decompressors.zstd, zstandard.compress(data)),
+    ):
+        offsets: collections.deque = collections.deque()
+        lines = [bytes(line) for line in decompressor(io.BytesIO(blob), offsets=offsets)]
+        assert len(offsets) == len(lines)
+        # the offset after a line is where the next one starts
+        for row, offset in enumerate(offsets):
+            resumed = decompressor(io.BytesIO(blob), start_byte=offset)
+            assert [bytes(line).rstrip(b"\r") for line in resumed] == expected[row + 1 :]
+
+        # offsets of skipped rows aren't recorded
+        offsets.clear()
+        assert len(list(decompressor(io.BytesIO(blob), start_row=2, offsets=offsets))) == 2
+        assert list(offsets) == [26, len(data)]
+
+
+def test_reader_can_read_zstd():
+    r = Reader(
+        inner_reader=DiskReader,
+        dataset="tests/data/nvd",
+        raw_path=True,
+    )
+    assert isinstance(r.first(), dict)
+
+
 if __name__ == "__main__":  # pragma: no cover
     from tests.helpers.runner import run_tests
 
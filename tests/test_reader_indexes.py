@@ -0,0 +1,130 @@
+"""
+Test indexes written by the writer are used by the reader
+"""
+
+import datetime
+import glob
+import os
+import shutil
+import sys
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+from mabel.adapters.disk import DiskReader, DiskWriter
+from mabel.data import BatchWriter
+from mabel.data import Reader
+from mabel.data.internals.dnf_filters import DnfFilters
+from mabel.data.internals.expression import Expression
+from mabel.data.internals.index import Index
+from mabel.data.internals.index import search_indexes
+from rich import traceback
+
+traceback.install()
+
+# fmt: off
+TEST_DATA = [
+    {"user": "alice", "value": 1},
+    {"user": "bob", "value": 2},
+    {"user": "carol", "value": 3},
+    {"user": "alice", "value": 4},
+    {"user": "dave", "value": 5.0},
+]
+# fmt: on
+
+
+def write_indexed_dataset(format="jsonl"):
+    shutil.rmtree("_temp/indexed", ignore_errors=True)
+    w = BatchWriter(
+        inner_writer=DiskWriter,
+        dataset="_temp/indexed",
+        format=format,
+        date=datetime.datetime.utcnow().date(),
+        schema=False,
+        index_on=["user"],
+        blob_size=256,
+    )
+    for i in range(50):
+        w.append({"user": f"user-{i % 10}", "index": i})
+    w.finalize()
+
+
+def test_index_search():
+    idx = Index.build_index(TEST_DATA, "user")
+    assert idx.search(["alice"]) == {0, 3}
+    assert idx.search(["alice", "dave"]) == {0, 3, 4}
+    assert idx.search(["eve"]) == set()
+
+    idx = Index(Index.build_index(TEST_DATA, "value").bytes())
+    assert idx.search([5]) == {4}
+    assert idx.search([1.0]) == {0}
+
+
+def test_index_numbers_of_other_types():
+    import decimal
+    import fractions
+
+    import numpy
+
+    records = [
+        {"value": decimal.Decimal("1")},
+        {"value": numpy.int64(2)},
+        {"value": numpy.float64(2.5)},
+        {"value": numpy.bool_(True)},
+        {"value": fractions.Fraction(7, 2)},
+        {"value": decimal.Decimal("NaN")},
+        {"value": datetime.date(2020, 1, 1)},
+    ]
+    idx = Index.build_index(records, "value")
+    assert idx.size == 5
+    assert idx.search([1]) == {0, 3}
+    assert idx.search([2.0]) == {1}
+    assert idx.search([2.5, 3.5]) == {2, 4}
+
+
+def test_index_dnf_and_expressions():
+    indexes = {"user": Index.build_index(TEST_DATA, "user")}
+
+    assert search_indexes(indexes, DnfFilters([("user", "==", "bob")])) == {1}
+    assert search_indexes(indexes, DnfFilters([("user", "in", ["bob", "carol"])])) == {1, 2}
+    assert search_indexes(indexes, DnfFilters([("value", "==", 1)])) is None
+    assert search_indexes(indexes, [("user", "==", "bob"), ("value", ">", 1)]) == {1}
+    assert search_indexes(indexes, [[("user", "==", "bob")], [("value", ">", 1)]]) is None
+    assert search_indexes(indexes, [[("user", "==", "bob")], [("user", "==", "dave")]]) == {1, 4}
+
+    assert search_indexes(indexes, Expression("user == 'alice'")) == {0, 3}
+    assert search_indexes(indexes, Expression("user == 'alice' and value > 2")) == {0, 3}
+    assert search_indexes(indexes, Expression("user == 'alice' or value > 2")) is None
+    assert search_indexes(indexes, Expression("user in ('bob', 'dave')")) == {1, 4}
+
+
+def test_writer_writes_indexes():
+    write_indexed_dataset()
+    blobs = glob.glob("_temp/indexed/**/*.jsonl", recursive=True)
+    indexes = glob.glob("_temp/indexed/**/*.user.idx", recursive=True)
+    assert len(blobs) > 1, blobs
+    assert len(blobs) == len(indexes), indexes
+
+
+def test_reader_uses_indexes():
+    write_indexed_dataset()
+
+    r = Reader(inner_reader=DiskReader, dataset="_temp/indexed", filters=[("user", "==", "user-3")])
+    assert sorted(r["index"] for r in r) == [3, 13, 23, 33, 43]
+
+    r = Reader(inner_reader=DiskReader, dataset="_temp/indexed", filters="user == 'user-4'")
+    assert sorted(r["index"] for r in r) == [4, 14, 24, 34, 44]
+
+    r = Reader(
+        inner_reader=DiskReader,
+        dataset="_temp/indexed",
+        filters="user in ('user-1', 'user-2') and index > 20",
+    )
+    assert sorted(r["index"] for r in r) == [21, 22, 31, 32, 41, 42]
+
+    r = Reader(inner_reader=DiskReader, dataset="_temp/indexed", filters="user == 'nobody'")
+    assert len(list(r)) == 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from tests.helpers.runner import run_tests
+
+    run_tests()
@@ -0,0 +1,79 @@
+"""
+Test records which are only decoded as they're accessed
+"""
+
+import os
+import pickle
+import sys
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+from mabel.adapters.disk import DiskReader
+from mabel.data import STORAGE_CLASS
+from mabel.data import Reader
+from mabel.data.readers.internals.parsers import LazyRecord
+from mabel.data.readers.internals.parsers import lazy_json
+from rich import traceback
+
+traceback.install()
+
+
+def read(**kwargs):
+    return Reader(inner_reader=DiskReader, dataset="tests/data/tweets", partitions=[], **kwargs)
+
+
+def test_lazy_record():
+    record = lazy_json(b'{"a": 1, "b": {"c": [1, 2]}, "d": null}')
+    assert isinstance(record, LazyRecord)
+    assert record["a"] == 1
+    assert record.get("b") == {"c": [1, 2]}
+    assert isinstance(record["b"], dict)
+    assert record.get("missing", 7) == 7
+    assert record.get("d", 7) is None
+    assert "d" in record and "missing" not in record
+    assert sorted(record) == ["a", "b", "d"]
+    assert len(record) == 3
+    assert record.mini == b'{"a":1,"b":{"c":[1,2]},"d":null}'
+    assert record == {"a": 1, "b": {"c": [1, 2]}, "d": None}
+    assert pickle.loads(pickle.dumps(record)) == {"a": 1, "b": {"c": [1, 2]}, "d": None}
+
+    # changing a record decodes it
+    record["e"] = 5
+    del record["a"]
+    assert record.as_dict() == {"b": {"c": [1, 2]}, "d": None, "e": 5}
+    assert record.mini == b'{"b":{"c":[1,2]},"d":null,"e":5}'
+
+    # lines which aren't objects aren't lazy
+    assert lazy_json(b"[1, 2]") == [1, 2]
+    assert lazy_json(memoryview(b"3")) == 3
+
+
+def test_reader_with_lazy_records():
+    assert list(read(lazy_records=True)) == list(read())
+
+    select = "username, followers"
+    filters = "followers > 1000000 and user_verified = true"
+    assert list(read(lazy_records=True, select=select, filters=filters)) == list(
+        read(select=select, filters=filters)
+    )
+    assert list(read(lazy_records=True, filters=[("username", "==", "BBCNews")])) == list(
+        read(filters=[("username", "==", "BBCNews")])
+    )
+
+
+def test_lazy_records_can_be_persisted():
+    expected = list(read())
+    for persistence in (
+        STORAGE_CLASS.MEMORY,
+        STORAGE_CLASS.DISK,
+        STORAGE_CLASS.COMPRESSED_MEMORY,
+    ):
+        r = read(lazy_records=True, persistence=persistence)
+        assert r.count() == len(expected), persistence
+        assert list(r) == expected, persistence
+        assert r.collect_list("username") == [row["username"] for row in expected]
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from tests.helpers.runner import run_tests
+
+    run_tests()
@@ -0,0 +1,82 @@
+"""
+Test the blob listing cache
+"""
+
+import datetime
+import os
+import shutil
+import sys
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+from mabel.adapters.disk import DiskReader
+from mabel.data import Reader
+from mabel.data.readers.internals import listing_cache
+from mabel.data.readers.internals.listing_cache import LISTING_CACHE
+from mabel.data.readers.internals.listing_cache import ListingCache
+from rich import traceback
+
+traceback.install()
+
+
+def test_listing_cache_expiry_and_invalidation():
+    cache = ListingCache(maximum_entries=2)
+    cache.set("reader", "bucket/dataset/one", ["one.jsonl"], ttl=60)
+    cache.set("reader", "bucket/dataset/two", ["two.jsonl"], ttl=-1)
+    assert cache.get("reader", "bucket/dataset/one") == ["one.jsonl"]
+    assert cache.get("other", "bucket/dataset/one") is None
+    # expired
+    assert cache.get("reader", "bucket/dataset/two") is None
+
+    cache.set("reader", "bucket/dataset/three", ["three.jsonl"], ttl=60)
+    cache.invalidate("bucket/dataset/th")
+    assert cache.get("reader", "bucket/dataset/three") is None
+    assert cache.get("reader", "bucket/dataset/one") == ["one.jsonl"]
+
+    # the least recently used entry is evicted
+    cache.set("reader", "a", [], ttl=60)
+    cache.set("reader", "b", [], ttl=60)
+    assert cache.get("reader", "bucket/dataset/one") is None
+
+    cache.invalidate()
+    assert cache.get("reader", "a") is None
+
+
+def test_reader_uses_listing_cache():
+    shutil.rmtree("_temp/listing", ignore_errors=True)
+    os.makedirs("_temp/listing", exist_ok=True)
+    with open("_temp/listing/one.jsonl", "w") as f:
+        f.write('{"a": 1}\n')
+
+    LISTING_CACHE.invalidate()
+    r = Reader(inner_reader=DiskReader, dataset="_temp/listing", partitions=[], cache_listings=True)
+    assert len(list(r)) == 1
+
+    # the second file isn't seen until the cache is invalidated
+    with open("_temp/listing/two.jsonl", "w") as f:
+        f.write('{"a": 2}\n')
+    r = Reader(inner_reader=DiskReader, dataset="_temp/listing", partitions=[], cache_listings=True)
+    assert len(list(r)) == 1
+    r = Reader(inner_reader=DiskReader, dataset="_temp/listing", partitions=[])
+    assert len(list(r)) == 2
+
+    LISTING_CACHE.invalidate("_temp/listing")
+    r = Reader(inner_reader=DiskReader, dataset="_temp/listing", partitions=[], cache_listings=True)
+    assert len(list(r)) == 2
+
+
+def test_past_partitions_are_cached_for_longer():
+    LISTING_CACHE.invalidate()
+    yesterday = datetime.datetime.utcnow().date() - datetime.timedelta(days=1)
+    reader = DiskReader(dataset="_temp/listing/{yyyy}/{mm}/{dd}", cache_listings=True)
+    reader.start_date = reader.end_date = datetime.datetime.combine(yesterday, datetime.time())
+    reader.get_list_of_blobs()
+
+    (expires, blobs), *_ = LISTING_CACHE._entries.values()
+    remaining = expires - listing_cache.time.monotonic()
+    assert remaining > listing_cache.CURRENT_PARTITION_TTL, remaining
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from tests.helpers.runner import run_tests
+
+    run_tests()
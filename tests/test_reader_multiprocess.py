@@ -0,0 +1,109 @@
+"""
+Test the pages of records handed back from the multiprocess workers
+"""
+
+import os
+import sys
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+from mabel.data.readers.internals.multiprocess_wrapper import _paginate
+from mabel.data.readers.internals.multiprocess_wrapper import _read_page
+from mabel.data.readers.internals.multiprocess_wrapper import _write_pickled_page
+from rich import traceback
+
+traceback.install()
+
+
+def test_pagination():
+    pages = list(_paginate(range(25), 10))
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert list(_paginate([], 10)) == []
+
+
+def test_pages_are_unchanged():
+    page = [
+        {"name": "one", "value": 1, "tags": ["a", "b"], "nested": {"x": 1.5}},
+        {"name": "two", "value": None, "tags": [], "nested": {"y": 2}},
+        {"a": 2.5, "b": [1, "two"]},
+    ]
+    message = _write_pickled_page(page)
+    assert message[0] == "pickle"
+    assert _read_page(message) == page
+
+
+def write_blobs():
+    import orjson
+
+    # records with nested fields which differ, integers and floats in the same
+    # field, and fields which aren't in every record
+    os.makedirs("_temp/multiprocess", exist_ok=True)
+    for blob in range(6):
+        with open(f"_temp/multiprocess/{blob}.jsonl", "wb") as file:
+            for row in range(50):
+                record = {"id": blob * 100 + row, "value": row if row % 2 else row / 2}
+                if row % 3 == 0:
+                    record["nested"] = {"x": row}
+                elif row % 3 == 1:
+                    record["nested"] = {"y": str(row), "z": [row, None]}
+                if blob % 2:
+                    record["extra"] = True
+                file.write(orjson.dumps(record) + b"\n")
+
+
+def test_multiprocess_reads_match_serial_reads():
+    import orjson
+
+    from mabel.adapters.disk import DiskReader
+    from mabel.data import Reader
+
+    write_blobs()
+
+    def read(multiprocess):
+        reader = Reader(
+            inner_reader=DiskReader,
+            dataset="_temp/multiprocess",
+            partitions=None,
+            multiprocess=multiprocess,
+        )
+        return sorted(reader, key=lambda record: record["id"])
+
+    serial = read(False)
+    parallel = read(True)
+    assert len(serial) == 300
+    assert [orjson.dumps(r) for r in parallel] == [orjson.dumps(r) for r in serial]
+    assert [list(map(type, r.values())) for r in parallel] == [
+        list(map(type, r.values())) for r in serial
+    ]
+
+
+def test_multiprocess_reads_resume_from_rows():
+    from mabel.adapters.disk import DiskReader
+    from mabel.data import Reader
+
+    write_blobs()
+
+    def read(cursor=None):
+        return Reader(
+            inner_reader=DiskReader,
+            dataset="_temp/multiprocess",
+            partitions=None,
+            multiprocess=True,
+            cursor=cursor,
+        )
+
+    reader = read()
+    seen = [next(reader)["id"] for i in range(130)]
+    cursor = reader.cursor.get()
+    # the blobs being read record the row and offset of the last record read
+    assert cursor["in_flight"]
+    for location, row, offset in cursor["in_flight"].values():
+        assert row == location and offset > 0, cursor
+
+    seen += [record["id"] for record in read(cursor)]
+    assert sorted(seen) == [blob * 100 + row for blob in range(6) for row in range(50)]
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from tests.helpers.runner import run_tests
+
+    run_tests()
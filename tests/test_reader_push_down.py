@@ -0,0 +1,73 @@
+"""
+Test selects, filters and takes on a Reader's DictSet are pushed down to the Reader
+"""
+
+import os
+import sys
+
+sys.path.insert(1, os.path.join(sys.path[0], ".."))
+from mabel import DictSet
+from mabel.adapters.disk import DiskReader
+from mabel.data import STORAGE_CLASS
+from mabel.data import Reader
+from rich import traceback
+
+traceback.install()
+
+
+def read(**kwargs):
+    return Reader(inner_reader=DiskReader, dataset="tests/data/tweets/", raw_path=True, **kwargs)
+
+
+def test_operations_are_pushed_down():
+    reader = read().filter("username == 'NBCNews'").select(["username", "text"]).take(5)
+    records = list(reader)
+    assert len(records) == 5
+    assert all(record["username"] == "NBCNews" for record in records)
+    assert all(list(record.keys()) == ["username", "text"] for record in records)
+
+    reader = read().filter([("username", "==", "NBCNews")]).filter([("user_verified", "==", True)])
+    assert reader._iterator.filters.predicates == [
+        ("username", "==", "NBCNews"),
+        ("user_verified", "==", True),
+    ]
+    assert read().select(["text"])._iterator.select.fields() == ["text"]
+    assert len(list(read().take(10).take(3))) == 3
+    # filters on fields which aren't selected are applied by the DictSet
+    reader = read().select(["text"]).filter("NOT username = 'x'")
+    assert reader._iterator.__class__.__name__ != "_LowLevelReader"
+
+
+def test_pushed_down_operations_match_dictset_operations():
+    for chain in (
+        [("filter", "username == 'NBCNews'"), ("select", ["text"])],
+        [("select", ["username"]), ("filter", [("username", "==", "NBCNews")])],
+        [("select", ["text"]), ("filter", "username == 'NBCNews'")],
+        [("select", ["text"]), ("filter", "NOT username = 'x'")],
+        [("select", ["text"]), ("filter", [("username", "!=", "x")])],
+        [("take", 3), ("filter", "username == 'NBCNews'")],
+        [("filter", "user_verified == true"), ("filter", [("username", "==", "NBCNews")])],
+        [("select", ["text", "missing"]), ("take", 4)],
+        [("take", 0)],
+    ):
+        pushed = read()
+        expected = DictSet(list(read()))
+        for operation, argument in chain:
+            pushed = getattr(pushed, operation)(argument)
+            expected = getattr(expected, operation)(argument)
+        assert list(pushed) == list(expected), chain
+
+
+def test_operations_are_not_pushed_down_once_reading():
+    reader = read()
+    next(reader)
+    assert reader.filter("username == 'NBCNews'")._iterator.__class__.__name__ != "_LowLevelReader"
+    # persisted readers have already been read
+    persisted = read(persistence=STORAGE_CLASS.MEMORY)
+    assert persisted.filter("username == 'NBCNews'").count() == 44
+
+
+if __name__ == "__main__":  # pragma: no cover
+    from tests.helpers.runner import run_tests
+
+    run_tests()